@@ -30,6 +30,7 @@ Long description of module's purpose
                     "hr",
                     "hr_expense",
                     "web",
+                    "bus",
                     "shipping_carrier",
                 ],
 
@@ -66,6 +67,8 @@ Long description of module's purpose
         'views/dashboard_hub_views.xml',
         'views/dashboard_item_views.xml',
         'views/dashboard_hub_menus.xml',
+        'views/qr_scan_device_token_views.xml',
+        'views/delivery_carrier_views.xml',
     ],
     
     # 'css': [
@@ -2,11 +2,55 @@
 from markupsafe import Markup
 from odoo import http, SUPERUSER_ID, fields, api
 from odoo.http import request
+from odoo.tools import json_default
+from datetime import datetime
+import hashlib
 import json
 import logging
 
+from .api_tools import admission_control, api_logged, compact_response, get_device_token, logged_route, mobile_auth
+from .cache_utils import LRUCache
+from ..models.qr_scan_notification import QR_NOTIFICATION_BUS_TYPE
+from ..services.dashboard_row_serializer import RECEIVED_ROW_FIELDS, row_fields_schema
+
 _logger = logging.getLogger(__name__)
 
+MY_RECEIVED_DEFAULT_LIMIT = 100
+MY_RECEIVED_MAX_LIMIT = 500
+
+# Cache response chi tiết phiếu đã serialize, khóa theo (db, picking, mode, version)
+PICKING_DETAIL_CACHE = LRUCache(maxsize=256)
+
+# Thông báo được đẩy qua bus; /api/notifications/poll chỉ là dự phòng với chu kỳ dài (giây)
+NOTIFICATION_POLL_INTERVAL = 300
+NOTIFICATION_DEFAULT_LIMIT = 50
+NOTIFICATION_MAX_LIMIT = 200
+
+# Số phiếu tối đa cho một yêu cầu chuyển giao hàng loạt
+REASSIGN_BULK_MAX_PICKINGS = 200
+
+# Các route được phép gọi qua /api/batch (route -> tên hàm trong QRScanAPI)
+BATCH_ROUTES = {
+    '/api/bootstrap': 'bootstrap',
+    '/api/picking/detail': 'picking_detail',
+    '/api/picking/prepare': 'picking_prepare',
+    '/api/picking/package': 'picking_package',
+    '/api/qr/parse': 'parse_qr_code',
+    '/api/picking/expenses': 'get_picking_expenses',
+    '/api/picking/expense/save': 'save_picking_expense',
+    '/api/picking/my_received': 'my_received_pickings',
+    '/api/picking/complete_delivery': 'complete_delivery',
+    '/api/employees/available': 'get_available_employees',
+    '/api/picking/reassign': 'reassign_picking',
+    '/api/picking/reassign_bulk': 'reassign_pickings_bulk',
+    '/api/notifications/list': 'get_notifications',
+    '/api/notifications/count': 'get_notifications_count',
+    '/api/notifications/poll': 'poll_notifications',
+    '/api/notifications/mark_read': 'mark_notifications_read',
+    '/api/notifications/respond': 'respond_notification',
+}
+BATCH_MAX_CALLS = 20
+
 class QRScanAPI(http.Controller):
 
     def _get_picking(self, picking_id):
@@ -18,8 +62,10 @@ class QRScanAPI(http.Controller):
             return None
 
     @http.route('/api/login', type='json', auth='none', methods=['POST'], csrf=False)
+    @api_logged
+    @compact_response
+    @admission_control
     def login(self, **params):
-        _logger.info("Mobile App Login Attempt: %s", params)
         db = params.get('db')
         login = params.get('login')
         password = params.get('password')
@@ -32,47 +78,161 @@ class QRScanAPI(http.Controller):
             if uid:
                 user = request.env['res.users'].sudo().browse(uid)
                 _logger.info("Login successful for user: %s (UID: %s)", user.name, uid)
-                return {
+                result = {
                     'status': 'success',
                     'uid': uid,
                     'name': user.name,
                     'session_id': request.session.sid,
                     'db': db
                 }
+                # App gửi device_id để nhận token thiết bị, dùng thay session cho các lần gọi sau
+                device_id = params.get('device_id')
+                if device_id:
+                    result['device_token'] = request.env['qr_scan.device.token'].sudo()._issue_token(
+                        user, device_id, params.get('device_name'))
+                return result
             return {'status': 'error', 'message': 'Sai tài khoản hoặc mật khẩu'}
         except Exception as e:
             _logger.error("Login Error: %s", str(e))
             return {'status': 'error', 'message': f'Lỗi hệ thống: {str(e)}'}
 
+    @http.route('/api/token/revoke', type='json', auth='none', methods=['POST'], csrf=False)
+    @api_logged
+    @compact_response
+    @admission_control
+    @mobile_auth
+    def revoke_device_token(self, **params):
+        """Thu hồi token thiết bị đang dùng (đăng xuất App)"""
+        try:
+            token = get_device_token()
+            if token:
+                request.env['qr_scan.device.token'].sudo()._revoke_token(token)
+            return {'status': 'success', 'message': 'Đã đăng xuất thiết bị'}
+        except Exception as e:
+            _logger.error("Revoke Token Error: %s", str(e), exc_info=True)
+            return {'status': 'error', 'message': str(e)}
+
+    @http.route('/api/bootstrap', type='json', auth='none', methods=['POST'], csrf=False)
+    @api_logged
+    @compact_response
+    @admission_control
+    @mobile_auth
+    def bootstrap(self, **params):
+        """Dữ liệu khởi động App trong một lần gọi
+
+        Params:
+            versions: {section: version} App đang giữ từ lần trước
+        Returns:
+            sections: profile, notifications, pickings, employees, expense_catalog.
+                Mỗi section có 'version'; section không đổi chỉ trả về {version, not_modified: True}.
+        """
+        try:
+            user_id = request.env.uid
+            # Giữ context (lang, tz) của request: catalog/danh bạ được cache theo ngôn ngữ
+            env_su = request.env(su=True)
+            known_versions = params.get('versions') or {}
+            user = env_su['res.users'].browse(int(user_id))
+            directory = env_su['hr.employee']._get_qr_employee_directory()
+            catalog = env_su['product.product']._get_qr_expense_catalog(user.company_id.id)
+            Picking = env_su['stock.picking']
+
+            def section(name, version, build):
+                if known_versions.get(name) == version:
+                    return {'version': version, 'not_modified': True}
+                return dict(build(), version=version)
+
+            employee = directory['by_user'].get(int(user_id))
+            profile = {
+                'uid': user.id,
+                'name': user.name,
+                'login': user.login,
+                'company_id': user.company_id.id,
+                'company_name': user.company_id.name,
+                'employee_id': employee['id'] if employee else None,
+                'department': employee['department'] if employee else '',
+            }
+            profile_version = hashlib.sha1(json.dumps(profile, sort_keys=True).encode()).hexdigest()[:16]
+            unread_count = user.qr_unread_notification_count
+
+            return {
+                'status': 'success',
+                'sections': {
+                    'profile': section('profile', profile_version, lambda: profile),
+                    'notifications': section('notifications', str(unread_count), lambda: {
+                        'unread_count': unread_count,
+                    }),
+                    'pickings': section(
+                        'pickings', Picking._qr_get_received_version(int(user_id)),
+                        lambda: self._bootstrap_pickings(Picking, int(user_id)),
+                    ),
+                    'employees': section('employees', self._employee_list_version(directory, user_id), lambda: {
+                        'data': [
+                            {
+                                'id': emp['id'],
+                                'name': emp['name'],
+                                'user_id': emp['user_id'],
+                                'department': emp['department'],
+                            }
+                            for emp in directory['employees'] if emp['user_id'] != user_id
+                        ],
+                    }),
+                    'expense_catalog': section('expense_catalog', catalog['version'], lambda: {
+                        'products': [dict(item) for item in catalog['products']],
+                        'default_product_id': catalog['default_product_id'],
+                    }),
+                },
+            }
+        except Exception as e:
+            _logger.error("Bootstrap API Error: %s", str(e), exc_info=True)
+            return {'status': 'error', 'message': str(e)}
+
+    def _bootstrap_pickings(self, Picking, user_id):
+        """Trang đầu phiếu 'Đã nhận', cùng định dạng với /api/picking/my_received"""
+        sync_token = Picking._qr_get_sync_token()
+        pickings = Picking._qr_search_received_page(user_id, MY_RECEIVED_DEFAULT_LIMIT)
+        next_cursor = None
+        if len(pickings) > MY_RECEIVED_DEFAULT_LIMIT:
+            pickings = pickings[:MY_RECEIVED_DEFAULT_LIMIT]
+            next_cursor = '%s,%s' % (pickings[-1].write_date.isoformat(), pickings[-1].id)
+        return {
+            'data': request.env['stock.picking.dashboard.row.serializer'].serialize(pickings.ids, RECEIVED_ROW_FIELDS),
+            'next_cursor': next_cursor,
+            'sync_token': sync_token,
+        }
+
     @http.route('/api/picking/detail', type='json', auth='none', methods=['POST'], csrf=False)
+    @api_logged
+    @compact_response
+    @admission_control
+    @mobile_auth
     def picking_detail(self, **params):
-        _logger.info("="*80)
-        _logger.info(">>> PICKING DETAIL API CALLED")
-        _logger.info(">>> Raw params: %s", params)
-        _logger.info(">>> Request data: %s", request.httprequest.get_data())
-        _logger.info("="*80)
-        
-        # Sử dụng auth='none' để bypass session check tự động của Odoo
+        # auth='none': xác thực bằng token thiết bị hoặc session qua @mobile_auth
         picking_id = params.get('picking_id')
         mode = params.get('mode')  # Get mode from App
-        _logger.info(">>> Extracted picking_id: %s (type: %s), mode: %s", picking_id, type(picking_id), mode)
-        
-        # VALIDATION: Check session
-        user_id = request.session.uid if getattr(request.session, 'uid', False) else None
-        if not user_id:
-            _logger.warning("Session expired or missing in picking_detail")
-            return {
-                'status': 'error',
-                'message': 'Phiên đăng nhập hết hạn. Vui lòng đăng nhập lại.',
-                'error_code': 'SESSION_EXPIRED'
-            }
-
 
         picking = self._get_picking(picking_id)
         if not picking or not picking.exists():
             _logger.warning("Picking ID %s NOT FOUND", picking_id)
             return {'status': 'error', 'message': 'Phiếu không tồn tại trên hệ thống'}
-        
+
+        # Conditional GET: App gửi lại version đã nhận (param 'version' hoặc header If-None-Match)
+        version = picking._get_qr_detail_version()
+        client_version = params.get('version') or request.httprequest.headers.get('If-None-Match', '').strip('"')
+        if client_version and client_version == version:
+            return {'status': 'not_modified', 'version': version}
+
+        cache_key = (request.env.cr.dbname, picking.id, mode, request.env.lang, version)
+        cached = PICKING_DETAIL_CACHE.get(cache_key)
+        if cached is not None:
+            return json.loads(cached)
+
+        result = self._prepare_picking_detail(picking, mode)
+        result['version'] = version
+        PICKING_DETAIL_CACHE.set(cache_key, json.dumps(result, default=json_default))
+        return result
+
+    def _prepare_picking_detail(self, picking, mode):
+        """Dựng payload chi tiết phiếu theo mode (prepare / shipping)"""
         # ========== EARLY VALIDATION - Kiểm tra ngay khi quét QR ==========
         
         # RULE 1: Không cho phép quét CHUẨN BỊ những đơn đã có trạng thái done
@@ -148,7 +308,7 @@ class QRScanAPI(http.Controller):
         
         # ========== END EARLY VALIDATION ==========
             
-        _logger.info("Found picking: %s with %s moves", picking.name, len(picking.move_ids))
+        _logger.debug("Found picking: %s with %s moves", picking.name, len(picking.move_ids))
         
         # Mode 'shipping' chỉ cần thông tin giao hàng, không cần danh sách sản phẩm
         if mode == 'shipping':
@@ -200,15 +360,15 @@ class QRScanAPI(http.Controller):
             }
             
         # Mode 'prepare' cần danh sách sản phẩm để xác nhận
+        # Tồn kho được tính gộp một lần cho mỗi vị trí nguồn
+        availability = picking._get_qr_stock_availability()
         grouped_data = {}
         for move in picking.move_ids:
             if move.state == 'cancel': continue
             key = (move.product_id.id, move.product_uom.id, move.location_id.id)
             if key not in grouped_data:
-                # Lấy số lượng tồn kho theo vị trí nguồn (product.product with context location)
-                product_loc = move.product_id.with_context(location=move.location_id.id)
-                qty_available = product_loc.qty_available
-                free_qty = product_loc.free_qty
+                # Lấy số lượng tồn kho theo vị trí nguồn
+                qty_available, free_qty = availability.get((move.product_id.id, move.location_id.id), (0.0, 0.0))
 
                 grouped_data[key] = {
                     'move_ids': [move.id],
@@ -248,27 +408,22 @@ class QRScanAPI(http.Controller):
         }
 
     @http.route('/api/picking/prepare', type='json', auth='none', methods=['POST'], csrf=False)
+    @api_logged
+    @compact_response
+    @admission_control
+    @mobile_auth
     def picking_prepare(self, **params):
         picking_id = params.get('picking_id')
-        _logger.info(">>> API call: picking_prepare for ID: %s", picking_id)
+        _logger.debug(">>> API call: picking_prepare for ID: %s", picking_id)
         
         picking = self._get_picking(picking_id)
         if not picking or not picking.exists():
             return {'status': 'error', 'message': 'Phiếu không tồn tại'}
             
         try:
-            # Get user from session
-            user_id = request.session.uid if getattr(request.session, 'uid', False) else None
+            user_id = request.env.uid
             
-            if not user_id:
-                _logger.warning("Session expired in picking_prepare")
-                return {
-                    'status': 'error',
-                    'message': 'Phiên đăng nhập hết hạn. Vui lòng đăng nhập lại.',
-                    'error_code': 'SESSION_EXPIRED'
-                }
-            
-            _logger.info("API call picking_prepare by User ID: %s", user_id)
+            _logger.debug("API call picking_prepare by User ID: %s", user_id)
             
             images = params.get('images', [])
             images_data = [{'data': img.get('data'), 'name': img.get('name'), 'description': 'Chuẩn bị từ App'} for img in images]
@@ -288,27 +443,22 @@ class QRScanAPI(http.Controller):
             return {'status': 'error', 'message': str(e)}
 
     @http.route('/api/picking/package', type='json', auth='none', methods=['POST'], csrf=False)
+    @api_logged
+    @compact_response
+    @admission_control
+    @mobile_auth
     def picking_package(self, **params):
         picking_id = params.get('picking_id')
-        _logger.info(">>> API call: picking_package for ID: %s", picking_id)
+        _logger.debug(">>> API call: picking_package for ID: %s", picking_id)
         
         picking = self._get_picking(picking_id)
         if not picking or not picking.exists():
             return {'status': 'error', 'message': 'Phiếu không tồn tại'}
             
         try:
-            # Get user from session
-            user_id = request.session.uid if getattr(request.session, 'uid', False) else None
+            user_id = request.env.uid
             
-            if not user_id:
-                _logger.warning("Session expired in picking_package")
-                return {
-                    'status': 'error',
-                    'message': 'Phiên đăng nhập hết hạn. Vui lòng đăng nhập lại.',
-                    'error_code': 'SESSION_EXPIRED'
-                }
-            
-            _logger.info("API call picking_package by User ID: %s", user_id)
+            _logger.debug("API call picking_package by User ID: %s", user_id)
             
             images = params.get('images', [])
             images_data = [{'data': img.get('data'), 'name': img.get('name'), 'description': 'Đóng gói từ App'} for img in images]
@@ -334,6 +484,10 @@ class QRScanAPI(http.Controller):
             return {'status': 'error', 'message': str(e)}
 
     @http.route('/api/qr/parse', type='json', auth='none', methods=['POST'], csrf=False)
+    @api_logged
+    @compact_response
+    @admission_control
+    @mobile_auth
     def parse_qr_code(self, **params):
         """Parse QR code và trả về thông tin model"""
         try:
@@ -361,14 +515,19 @@ class QRScanAPI(http.Controller):
             return {'status': 'error', 'message': str(e)}
 
     @http.route('/api/picking/expenses', type='json', auth='none', methods=['POST'], csrf=False)
+    @api_logged
+    @compact_response
+    @admission_control
+    @mobile_auth
     def get_picking_expenses(self, **params):
         """Lấy danh sách chi phí liên quan đến picking / sale order
         
         Params:
             picking_id: ID phiếu xuất kho
+            catalog_version: (optional) version danh mục chi phí App đang giữ
         Returns:
             expenses: list of hr.expense records
-            expense_products: list of product có thể dùng làm chi phí
+            expense_products: list of product có thể dùng làm chi phí (None nếu catalog_version không đổi)
         """
         try:
             picking_id = params.get('picking_id')
@@ -378,62 +537,33 @@ class QRScanAPI(http.Controller):
 
             sale = picking.sale_id
 
-            # Lấy danh sách expense đã có (liên kết qua sale order)
-            expenses = []
-            if sale:
-                exp_records = request.env['hr.expense'].with_user(SUPERUSER_ID).search([
-                    ('sale_id', '=', sale.id)
-                ], order='date desc')
-                for exp in exp_records:
-                    expenses.append({
-                        'id': exp.id,
-                        'name': exp.name,
-                        'total_amount_currency': exp.total_amount_currency,
-                        'date': exp.date.isoformat() if exp.date else '',
-                        'description': exp.description or '',
-                        'state': exp.state,
-                        'employee_name': exp.employee_id.name if exp.employee_id else '',
-                        'product_name': exp.product_id.name if exp.product_id else '',
-                    })
-
-            # Lấy danh sách sản phẩm chi phí (expense products)
-            expense_products = []
-            products = request.env['product.product'].with_user(SUPERUSER_ID).search([
-                ('can_be_expensed', '=', True)
-            ], limit=50)
-            
-            # Ưu tiên "Chi phí vận chuyển đơn hàng" lên đầu tiên
-            products = sorted(products, key=lambda p: 0 if p.name == 'Chi phí vận chuyển đơn hàng' else 1)
-            
-            for p in products:
-                expense_products.append({
-                    'id': p.id,
-                    'name': p.name,
-                    'account_id': p.property_account_expense_id.id if p.property_account_expense_id else None,
-                    'account_name': p.property_account_expense_id.name if p.property_account_expense_id else '',
-                })
+            # Lấy danh sách expense đã có (liên kết qua sale order), một câu SQL
+            expenses = sale.with_user(SUPERUSER_ID)._get_qr_expense_rows() if sale else []
+
+            # Danh mục sản phẩm chi phí, cache theo công ty
+            catalog = request.env['product.product']._get_qr_expense_catalog(picking.company_id.id)
+            expense_products = [dict(item) for item in catalog['products']]
+            if params.get('catalog_version') and params['catalog_version'] == catalog['version']:
+                # App đã có danh mục mới nhất, không cần gửi lại
+                expense_products = None
 
             # Thông tin mặc định (NVKD để điền employee_id)
             salesperson = sale.user_id if sale and sale.user_id else None
             employee = None
             if salesperson:
-                employee = request.env['hr.employee'].with_user(SUPERUSER_ID).search([
-                    ('user_id', '=', salesperson.id)
-                ], limit=1)
-
-            default_product = next((p for p in expense_products if p['name'] == 'Chi phí vận chuyển đơn hàng'), None)
-            default_product_id = default_product['id'] if default_product else (expense_products[0]['id'] if expense_products else None)
+                employee = request.env['hr.employee']._get_qr_employee_directory()['by_user'].get(salesperson.id)
 
             return {
                 'status': 'success',
                 'sale_name': sale.name if sale else '',
                 'sale_id': sale.id if sale else None,
                 'picking_name': picking.name,
-                'employee_id': employee.id if employee else None,
-                'employee_name': employee.name if employee else (salesperson.name if salesperson else ''),
+                'employee_id': employee['id'] if employee else None,
+                'employee_name': employee['name'] if employee else (salesperson.name if salesperson else ''),
                 'expenses': expenses,
                 'expense_products': expense_products,
-                'default_expense_product_id': default_product_id,
+                'catalog_version': catalog['version'],
+                'default_expense_product_id': catalog['default_product_id'],
             }
 
         except Exception as e:
@@ -441,6 +571,10 @@ class QRScanAPI(http.Controller):
             return {'status': 'error', 'message': str(e)}
 
     @http.route('/api/picking/expense/save', type='json', auth='none', methods=['POST'], csrf=False)
+    @api_logged
+    @compact_response
+    @admission_control
+    @mobile_auth
     def save_picking_expense(self, **params):
         """Tạo mới hoặc cập nhật chi phí vận chuyển
         
@@ -452,9 +586,7 @@ class QRScanAPI(http.Controller):
             description: Nội dung ghi chú
         """
         try:
-            user_id = request.session.uid if getattr(request.session, 'uid', False) else None
-            if not user_id:
-                return {'status': 'error', 'message': 'Phiên đăng nhập hết hạn', 'error_code': 'SESSION_EXPIRED'}
+            user_id = request.env.uid
 
             picking_id = params.get('picking_id')
             picking = self._get_picking(picking_id)
@@ -469,29 +601,22 @@ class QRScanAPI(http.Controller):
             total_amount = params.get('total_amount_currency', 0)
             description = params.get('description', '')
 
+            catalog = request.env['product.product']._get_qr_expense_catalog(picking.company_id.id)
+
             # Tự động gán danh mục "Chi phí vận chuyển đơn hàng" nếu rỗng
             if not product_id:
-                default_prod = request.env['product.product'].sudo().search([
-                    ('name', '=', 'Chi phí vận chuyển đơn hàng'), 
-                    ('can_be_expensed', '=', True)
-                ], limit=1)
-                if default_prod:
-                    product_id = default_prod.id
+                product_id = catalog['shipping_product_id']
 
             if not product_id:
                 return {'status': 'error', 'message': 'Vui lòng chọn danh mục chi phí!'}
             if not total_amount or float(total_amount) <= 0:
                 return {'status': 'error', 'message': 'Vui lòng nhập số tiền chi phí!'}
 
-            product = request.env['product.product'].sudo().browse(int(product_id))
-
             # Lấy employee của NVKD
             salesperson = sale.user_id
             employee = None
             if salesperson:
-                employee = request.env['hr.employee'].with_user(SUPERUSER_ID).search([
-                    ('user_id', '=', salesperson.id)
-                ], limit=1)
+                employee = request.env['hr.employee']._get_qr_employee_directory()['by_user'].get(salesperson.id)
 
             expense_env = request.env['hr.expense'].with_user(user_id).sudo()
             expense_id = params.get('expense_id')
@@ -511,8 +636,13 @@ class QRScanAPI(http.Controller):
                 # Tạo mới expense
                 from odoo import fields as odoo_fields
                 expense_name = f"Chi phí Vận chuyển - Gửi xe - {sale.name}"
-                account = product.property_account_expense_id
-                
+                catalog_item = catalog['by_id'].get(int(product_id))
+                if catalog_item:
+                    account_id = catalog_item['account_id']
+                else:
+                    product = request.env['product.product'].sudo().with_company(picking.company_id).browse(int(product_id))
+                    account_id = product.property_account_expense_id.id
+
                 vals = {
                     'name': expense_name,
                     'product_id': int(product_id),
@@ -523,9 +653,9 @@ class QRScanAPI(http.Controller):
                     'sale_id': sale.id,
                 }
                 if employee:
-                    vals['employee_id'] = employee.id
-                if account:
-                    vals['account_id'] = account.id
+                    vals['employee_id'] = employee['id']
+                if account_id:
+                    vals['account_id'] = account_id
 
                 expense = expense_env.create(vals)
                 msg = 'Thêm chi phí vận chuyển thành công!'
@@ -541,69 +671,94 @@ class QRScanAPI(http.Controller):
             return {'status': 'error', 'message': str(e)}
 
     @http.route('/api/picking/my_received', type='json', auth='none', methods=['POST'], csrf=False)
+    @api_logged
+    @compact_response
+    @admission_control
+    @mobile_auth
     def my_received_pickings(self, **params):
-        """Lấy danh sách phiếu trạng thái 'received' (Đã nhận) của user hiện tại"""
+        """Lấy danh sách phiếu trạng thái 'received' (Đã nhận) của user hiện tại
+
+        Params:
+            limit: số phiếu mỗi trang (mặc định 100)
+            cursor: next_cursor của trang trước (phân trang keyset)
+            since: sync_token của lần đồng bộ trước, chỉ trả về phiếu thay đổi sau mốc này
+            known_ids: danh sách id App đang giữ, để trả về removed_ids (phiếu không còn thuộc user)
+            fields: (tùy chọn) chỉ trả về các field này, xem /api/picking/my_received/schema
+        """
         try:
-            # Lấy user từ session
-            user_id = request.session.uid if getattr(request.session, 'uid', False) else None
-            if not user_id:
-                return {
-                    'status': 'error',
-                    'message': 'Phiên đăng nhập hết hạn. Vui lòng đăng nhập lại.',
-                    'error_code': 'SESSION_EXPIRED'
-                }
-                
-            domain = [
-                ('picking_type_code', '=', 'outgoing'),
-                ('ship_inf_state', '=', 'received'),
-                ('shipping_confirmed_by', '=', int(user_id)),
-            ]
-            
-            # Sử dụng sudo() để duyệt qua các phiếu kho
-            pickings = request.env['stock.picking'].sudo().search(domain, order='write_date desc')
-            
-            data = []
-            for picking in pickings:
-                data.append({
-                    'id': picking.id,
-                    'name': picking.name,
-                    'origin': picking.origin or '',
-                    'state': picking.state,
-                    'scheduled_date': picking.scheduled_date.isoformat() if picking.scheduled_date else None,
-                    'customer': picking.partner_id.name or '',
-                    'shipping_method': picking.shipping_method.name if picking.shipping_method else '',
-                    'ship_inf_state': picking.ship_inf_state,
-                    'recipient_info': picking.recipient_info or '',
-                    'park_info': picking.park_info or '',
-                })
-                
+            user_id = request.env.uid
+            Picking = request.env['stock.picking'].sudo()
+
+            limit = min(int(params.get('limit') or MY_RECEIVED_DEFAULT_LIMIT), MY_RECEIVED_MAX_LIMIT)
+            cursor = self._parse_keyset_cursor(params.get('cursor'))
+            since = fields.Datetime.to_datetime(params.get('since')) if params.get('since') else None
+            sync_token = Picking._qr_get_sync_token()
+
+            pickings = Picking._qr_search_received_page(user_id, limit, cursor=cursor, since=since)
+            next_cursor = None
+            if len(pickings) > limit:
+                pickings = pickings[:limit]
+                next_cursor = '%s,%s' % (pickings[-1].write_date.isoformat(), pickings[-1].id)
+
+            # Chỉ dựng các field App yêu cầu (tham số 'fields'), bằng một câu SQL projection
+            data = request.env['stock.picking.dashboard.row.serializer'].serialize(
+                pickings.ids, RECEIVED_ROW_FIELDS, field_names=params.get('fields'),
+            )
+
+            removed_ids = []
+            known_ids = [int(pid) for pid in params.get('known_ids') or []]
+            if known_ids:
+                still_received = Picking.search([
+                    ('id', 'in', known_ids),
+                    ('picking_type_code', '=', 'outgoing'),
+                    ('ship_inf_state', '=', 'received'),
+                    ('shipping_confirmed_by', '=', int(user_id)),
+                ])
+                removed_ids = sorted(set(known_ids) - set(still_received.ids))
+
             return {
                 'status': 'success',
                 'data': data,
+                'next_cursor': next_cursor,
+                'removed_ids': removed_ids,
+                'sync_token': sync_token,
             }
         except Exception as e:
             _logger.error("My Received API Error: %s", str(e), exc_info=True)
             return {'status': 'error', 'message': str(e)}
 
+    @http.route('/api/picking/my_received/schema', type='json', auth='none', methods=['POST'], csrf=False)
+    @api_logged
+    @compact_response
+    @admission_control
+    @mobile_auth
+    def my_received_schema(self, **params):
+        """Các field có thể chọn qua tham số 'fields' của /api/picking/my_received"""
+        return {'status': 'success', 'fields': row_fields_schema(RECEIVED_ROW_FIELDS)}
+
+    def _parse_keyset_cursor(self, cursor):
+        """Cursor dạng '<write_date ISO>,<id>' -> (datetime, id)"""
+        if not cursor:
+            return None
+        date_part, id_part = cursor.rsplit(',', 1)
+        return datetime.fromisoformat(date_part), int(id_part)
+
     @http.route('/api/picking/complete_delivery', type='json', auth='none', methods=['POST'], csrf=False)
+    @api_logged
+    @compact_response
+    @admission_control
+    @mobile_auth
     def complete_delivery(self, **params):
         """NV giao hàng upload ảnh minh chứng + xác nhận đã giao xong"""
         picking_id = params.get('picking_id')
-        _logger.info(">>> API call: complete_delivery for ID: %s", picking_id)
+        _logger.debug(">>> API call: complete_delivery for ID: %s", picking_id)
         
         picking = self._get_picking(picking_id)
         if not picking or not picking.exists():
             return {'status': 'error', 'message': 'Phiếu không tồn tại'}
             
         try:
-            # Lấy user từ session
-            user_id = request.session.uid if getattr(request.session, 'uid', False) else None
-            if not user_id:
-                return {
-                    'status': 'error',
-                    'message': 'Phiên đăng nhập hết hạn. Vui lòng đăng nhập lại.',
-                    'error_code': 'SESSION_EXPIRED'
-                }
+            user_id = request.env.uid
                 
             images = params.get('images', [])
             images_data = [{'data': img.get('data'), 'name': img.get('name'), 'description': 'Hoàn thành từ App'} for img in images]
@@ -623,74 +778,59 @@ class QRScanAPI(http.Controller):
             return {'status': 'error', 'message': str(e)}
 
     @http.route('/api/employees/available', type='json', auth='none', methods=['POST'], csrf=False)
+    @api_logged
+    @compact_response
+    @admission_control
+    @mobile_auth
     def get_available_employees(self, **params):
-        """Lấy danh sách nhân viên có thể được giao công việc gửi xe"""
+        """Lấy danh sách nhân viên có thể được giao công việc gửi xe
+
+        Params:
+            version: version danh bạ App đang giữ, trùng thì trả về 'not_modified'
+            department_id: (optional) chỉ lấy nhân viên thuộc phòng ban này
+        """
         try:
-            # Lấy user từ session
-            user_id = request.session.uid if getattr(request.session, 'uid', False) else None
-            if not user_id:
-                return {
-                    'status': 'error',
-                    'message': 'Phiên đăng nhập hết hạn. Vui lòng đăng nhập lại.',
-                    'error_code': 'SESSION_EXPIRED'
-                }
-            
-            _logger.info("=== Getting Available Employees ===")
-            _logger.info("Current user_id: %s", user_id)
-            
-            # Tạo environment với SUPERUSER để tránh lỗi singleton
-            env_su = api.Environment(request.cr, SUPERUSER_ID, {})
-            employee_env = env_su['hr.employee']
-            
-            # Kiểm tra tổng số nhân viên active
-            total_employees = employee_env.search_count([('active', '=', True)])
-            _logger.info("Total active employees: %s", total_employees)
-            
-            # Kiểm tra nhân viên có user_id
-            employees_with_user = employee_env.search_count([
-                ('active', '=', True),
-                ('user_id', '!=', False)
-            ])
-            _logger.info("Employees with user_id: %s", employees_with_user)
-            
-            # Lấy danh sách nhân viên active (bỏ điều kiện user_id để dễ debug)
-            # Trong production nên giữ điều kiện user_id != False
-            employees = employee_env.search([
-                ('active', '=', True),
-                # ('user_id', '!=', False),  # Tạm comment để debug
-                # ('user_id', '!=', int(user_id)),  # Tạm comment để debug
-            ], order='name')
-            
-            _logger.info("Found %s employees for selection", len(employees))
-            
-            data = []
-            for emp in employees:
-                # Bỏ qua chính user hiện tại nếu có
-                if emp.user_id and emp.user_id.id == int(user_id):
-                    continue
-                    
-                emp_data = {
-                    'id': emp.id,
-                    'name': emp.name,
-                    'user_id': emp.user_id.id if emp.user_id else None,
-                    'department': emp.department_id.name if emp.department_id else '',
+            user_id = request.env.uid
+            directory = request.env['hr.employee'].sudo()._get_qr_employee_directory()
+            department_id = params.get('department_id')
+            version = self._employee_list_version(directory, user_id, department_id)
+
+            if params.get('version') and params['version'] == version:
+                return {'status': 'not_modified', 'version': version}
+
+            data = [
+                {
+                    'id': emp['id'],
+                    'name': emp['name'],
+                    'user_id': emp['user_id'],
+                    'department': emp['department'],
                 }
-                data.append(emp_data)
-                _logger.info("Employee: %s (ID: %s, User: %s)", emp.name, emp.id, emp.user_id.id if emp.user_id else 'No User')
-            
-            _logger.info("Returning %s employees to frontend", len(data))
-            
+                for emp in directory['employees']
+                # Bỏ qua chính user hiện tại
+                if emp['user_id'] != user_id
+                and (not department_id or emp['department_id'] == int(department_id))
+            ]
+
             return {
                 'status': 'success',
                 'data': data,
+                'version': version,
             }
         except Exception as e:
             _logger.error("Get Available Employees Error: %s", str(e), exc_info=True)
             return {'status': 'error', 'message': str(e)}
 
-
+    def _employee_list_version(self, directory, user_id, department_id=None):
+        """Version của danh sách nhân viên trả về cho user: danh sách đã bỏ chính user
+        và lọc theo phòng ban, nên version phải gồm cả hai ngoài version danh bạ"""
+        raw = '%s:%s:%s' % (directory['version'], user_id, int(department_id) if department_id else '')
+        return hashlib.sha1(raw.encode()).hexdigest()[:16]
 
     @http.route('/api/picking/reassign', type='json', auth='none', methods=['POST'], csrf=False)
+    @api_logged
+    @compact_response
+    @admission_control
+    @mobile_auth
     def reassign_picking(self, **params):
         """Chuyển phiếu giao vận cho người khác và gửi thông báo xác nhận
         
@@ -699,14 +839,7 @@ class QRScanAPI(http.Controller):
             new_employee_id: ID nhân viên mới
         """
         try:
-            # Lấy user từ session
-            user_id = request.session.uid if getattr(request.session, 'uid', False) else None
-            if not user_id:
-                return {
-                    'status': 'error',
-                    'message': 'Phiên đăng nhập hết hạn. Vui lòng đăng nhập lại.',
-                    'error_code': 'SESSION_EXPIRED'
-                }
+            user_id = request.env.uid
             
             picking_id = params.get('picking_id')
             new_employee_id = params.get('new_employee_id')
@@ -729,16 +862,14 @@ class QRScanAPI(http.Controller):
             # Tạo environment với SUPERUSER
             env_su = api.Environment(request.cr, SUPERUSER_ID, {})
             
-            # Lấy thông tin nhân viên mới
-            new_employee = env_su['hr.employee'].browse(int(new_employee_id))
-            if not new_employee.exists() or not new_employee.user_id:
+            # Lấy thông tin nhân viên mới và người yêu cầu chuyển từ danh bạ đã cache
+            directory = env_su['hr.employee']._get_qr_employee_directory()
+            new_employee = directory['by_id'].get(int(new_employee_id))
+            if not new_employee or not new_employee['user_id']:
                 return {'status': 'error', 'message': 'Nhân viên không tồn tại hoặc chưa có tài khoản người dùng'}
             
-            # Lấy thông tin user hiện tại (người yêu cầu chuyển)
-            current_user = env_su['res.users'].browse(int(user_id))
-            current_employee = env_su['hr.employee'].search([
-                ('user_id', '=', int(user_id))
-            ], limit=1)
+            current_employee = directory['by_user'].get(int(user_id))
+            requester_name = current_employee['name'] if current_employee else env_su['res.users'].browse(int(user_id)).name
             
             order_info = f"{picking.origin}" if picking.origin else picking.name
             
@@ -746,11 +877,11 @@ class QRScanAPI(http.Controller):
             notification_vals = {
                 'notification_type': 'reassign_request',
                 'title': f'Yêu cầu nhận công việc giao hàng',
-                'message': f'{current_employee.name if current_employee else current_user.name} yêu cầu bạn thay thế giao hàng cho đơn {order_info} (Phiếu: {picking.name})',
-                'recipient_user_id': new_employee.user_id.id,
+                'message': f'{requester_name} yêu cầu bạn thay thế giao hàng cho đơn {order_info} (Phiếu: {picking.name})',
+                'recipient_user_id': new_employee['user_id'],
                 'picking_id': picking.id,
                 'from_user_id': int(user_id),
-                'new_employee_id': new_employee.id,
+                'new_employee_id': new_employee['id'],
                 'related_model': 'stock.picking',
                 'related_id': picking.id,
                 'is_read': False,
@@ -765,11 +896,11 @@ class QRScanAPI(http.Controller):
                 body=Markup(f"""
                     <p><strong>🔄 Yêu cầu chuyển giao công việc</strong></p>
                     <ul>
-                        <li><strong>Từ:</strong> {current_employee.name if current_employee else current_user.name}</li>
-                        <li><strong>Đến:</strong> {new_employee.name}</li>
+                        <li><strong>Từ:</strong> {requester_name}</li>
+                        <li><strong>Đến:</strong> {new_employee['name']}</li>
                         <li><strong>Thời gian:</strong> {fields.Datetime.now()}</li>
                     </ul>
-                    <p><em>Đang chờ {new_employee.name} xác nhận...</em></p>
+                    <p><em>Đang chờ {new_employee['name']} xác nhận...</em></p>
                 """),
                 subject=f'Yêu cầu chuyển giao: {picking.name}',
                 message_type='notification',
@@ -777,7 +908,7 @@ class QRScanAPI(http.Controller):
             
             return {
                 'status': 'success',
-                'message': f'Đã gửi yêu cầu chuyển công việc đến {new_employee.name}. Đang chờ xác nhận.',
+                'message': f'Đã gửi yêu cầu chuyển công việc đến {new_employee["name"]}. Đang chờ xác nhận.',
             }
             
         except Exception as e:
@@ -785,78 +916,121 @@ class QRScanAPI(http.Controller):
             return {'status': 'error', 'message': str(e)}
 
 
-    @http.route('/api/notifications/list', type='json', auth='none', methods=['POST'], csrf=False)
-    def get_notifications(self, **params):
-        """Lấy danh sách thông báo của user hiện tại"""
+    @http.route('/api/picking/reassign_bulk', type='json', auth='none', methods=['POST'], csrf=False)
+    @api_logged
+    @compact_response
+    @admission_control
+    @mobile_auth
+    def reassign_pickings_bulk(self, **params):
+        """Chuyển nhiều phiếu giao vận cho một nhân viên, gửi một thông báo gộp để xác nhận
+
+        Params:
+            picking_ids: danh sách ID phiếu cần chuyển
+            new_employee_id: ID nhân viên mới
+        """
         try:
-            # Lấy user từ session
-            user_id = request.session.uid if getattr(request.session, 'uid', False) else None
-            if not user_id:
+            user_id = request.env.uid
+
+            picking_ids = [int(pid) for pid in params.get('picking_ids') or []]
+            new_employee_id = params.get('new_employee_id')
+
+            if not picking_ids or not new_employee_id:
+                return {'status': 'error', 'message': 'Thiếu thông tin phiếu hoặc nhân viên mới'}
+            if len(picking_ids) > REASSIGN_BULK_MAX_PICKINGS:
+                return {'status': 'error', 'message': f'Chỉ được chuyển tối đa {REASSIGN_BULK_MAX_PICKINGS} phiếu mỗi lần'}
+
+            env_su = api.Environment(request.cr, SUPERUSER_ID, {})
+
+            # Kiểm tra toàn bộ phiếu bằng một truy vấn
+            pickings = env_su['stock.picking'].search([('id', 'in', picking_ids)])
+            pickings.fetch(['name', 'ship_inf_state'])
+            missing_ids = sorted(set(picking_ids) - set(pickings.ids))
+            if missing_ids:
+                return {'status': 'error', 'message': 'Phiếu không tồn tại', 'invalid_ids': missing_ids}
+            invalid = pickings.filtered(lambda p: p.ship_inf_state != 'received')
+            if invalid:
                 return {
                     'status': 'error',
-                    'message': 'Phiên đăng nhập hết hạn. Vui lòng đăng nhập lại.',
-                    'error_code': 'SESSION_EXPIRED'
+                    'message': f'Chỉ có thể chuyển phiếu đang ở trạng thái "Đã nhận": {", ".join(invalid.mapped("name"))}',
+                    'invalid_ids': invalid.ids,
                 }
+
+            directory = env_su['hr.employee']._get_qr_employee_directory()
+            new_employee = directory['by_id'].get(int(new_employee_id))
+            if not new_employee or not new_employee['user_id']:
+                return {'status': 'error', 'message': 'Nhân viên không tồn tại hoặc chưa có tài khoản người dùng'}
+
+            current_employee = directory['by_user'].get(int(user_id))
+            requester_name = current_employee['name'] if current_employee else env_su['res.users'].browse(int(user_id)).name
+
+            notification = env_su['qr_scan.notification']._qr_create_bulk_reassign_request(
+                pickings, env_su['hr.employee'].browse(new_employee['id']), int(user_id), requester_name,
+            )
+
+            return {
+                'status': 'success',
+                'message': f'Đã gửi yêu cầu chuyển {len(pickings)} phiếu đến {new_employee["name"]}. Đang chờ xác nhận.',
+                'notification_id': notification.id,
+            }
+
+        except Exception as e:
+            _logger.error("Bulk Reassign Error: %s", str(e), exc_info=True)
+            return {'status': 'error', 'message': str(e)}
+
+    @http.route('/api/notifications/list', type='json', auth='none', methods=['POST'], csrf=False)
+    @api_logged
+    @compact_response
+    @admission_control
+    @mobile_auth
+    def get_notifications(self, **params):
+        """Lấy danh sách thông báo của user hiện tại
+
+        Params:
+            limit: số thông báo mỗi trang (mặc định 50)
+            cursor: next_cursor của trang trước (id thông báo)
+            unread_only: chỉ lấy thông báo chưa đọc
+        """
+        try:
+            user_id = request.env.uid
             
             # Lấy danh sách thông báo
             env_su = api.Environment(request.cr, SUPERUSER_ID, {})
-            notifications = env_su['qr_scan.notification'].search([
-                ('recipient_user_id', '=', int(user_id))
-            ], order='create_date desc', limit=50)
-            
-            data = []
-            for notif in notifications:
-                notif_data = {
-                    'id': notif.id,
-                    'notification_type': notif.notification_type,
-                    'title': notif.title,
-                    'message': notif.message,
-                    'is_read': notif.is_read,
-                    'is_processed': notif.is_processed,
-                    'response': notif.response,
-                    'create_date': notif.create_date.isoformat() if notif.create_date else None,
-                    'response_date': notif.response_date.isoformat() if notif.response_date else None,
-                }
-                
-                # Thêm thông tin picking nếu có
-                if notif.picking_id:
-                    notif_data['picking_id'] = notif.picking_id.id
-                    notif_data['picking_name'] = notif.picking_id.name
-                    notif_data['order_name'] = notif.picking_id.origin or notif.picking_id.name
-                
-                # Thêm thông tin người gửi
-                if notif.from_user_id:
-                    notif_data['from_user_name'] = notif.from_user_id.name
-                
-                data.append(notif_data)
+            limit = min(int(params.get('limit') or NOTIFICATION_DEFAULT_LIMIT), NOTIFICATION_MAX_LIMIT)
+            notifications = env_su['qr_scan.notification']._qr_search_inbox(
+                user_id, limit + 1,
+                before_id=params.get('cursor'),
+                unread_only=bool(params.get('unread_only')),
+            )
+            next_cursor = None
+            if len(notifications) > limit:
+                notifications = notifications[:limit]
+                next_cursor = notifications[-1].id
+            
+            data = [notif._qr_to_dict() for notif in notifications]
             
             return {
                 'status': 'success',
                 'data': data,
+                'next_cursor': next_cursor,
+                'unread_count': env_su['res.users'].browse(int(user_id)).qr_unread_notification_count,
             }
         except Exception as e:
             _logger.error("Get Notifications Error: %s", str(e), exc_info=True)
             return {'status': 'error', 'message': str(e)}
 
     @http.route('/api/notifications/count', type='json', auth='none', methods=['POST'], csrf=False)
+    @api_logged
+    @compact_response
+    @admission_control
+    @mobile_auth
     def get_notifications_count(self, **params):
         """Lấy số lượng thông báo chưa đọc"""
         try:
-            # Lấy user từ session
-            user_id = request.session.uid if getattr(request.session, 'uid', False) else None
-            if not user_id:
-                return {
-                    'status': 'error',
-                    'message': 'Phiên đăng nhập hết hạn. Vui lòng đăng nhập lại.',
-                    'error_code': 'SESSION_EXPIRED'
-                }
+            user_id = request.env.uid
             
-            # Đếm thông báo chưa đọc
+            # Bộ đếm chưa đọc được duy trì sẵn trên res.users
             env_su = api.Environment(request.cr, SUPERUSER_ID, {})
-            unread_count = env_su['qr_scan.notification'].search_count([
-                ('recipient_user_id', '=', int(user_id)),
-                ('is_read', '=', False)
-            ])
+            unread_count = env_su['res.users'].browse(int(user_id)).qr_unread_notification_count
             
             return {
                 'status': 'success',
@@ -866,18 +1040,94 @@ class QRScanAPI(http.Controller):
             _logger.error("Get Notifications Count Error: %s", str(e), exc_info=True)
             return {'status': 'error', 'message': str(e)}
 
+    @http.route('/api/notifications/poll', type='json', auth='none', methods=['POST'], csrf=False)
+    @api_logged
+    @compact_response
+    @admission_control
+    @mobile_auth
+    def poll_notifications(self, **params):
+        """Lấy các thông báo đẩy trên bus mà App chưa nhận (dự phòng khi không có websocket)
+
+        Params:
+            last: id tin nhắn bus cuối cùng App đã nhận (0 ở lần đầu)
+        Returns:
+            notifications: các thông báo mới (kèm event 'created' / 'responded')
+            last: id tin nhắn bus mới nhất, App gửi lại ở lần poll sau
+            unread_count: số thông báo chưa đọc
+            poll_interval: số giây gợi ý giữa hai lần poll dự phòng
+        """
+        try:
+            user_id = request.env.uid
+            env_su = api.Environment(request.cr, SUPERUSER_ID, {})
+            Bus = env_su['bus.bus']
+
+            last = int(params.get('last') or 0)
+            partner = env_su['res.users'].browse(int(user_id)).partner_id
+
+            notifications = []
+            if last:
+                for message in Bus._poll([partner], last):
+                    last = max(last, message['id'])
+                    if message['message']['type'] == QR_NOTIFICATION_BUS_TYPE:
+                        notifications.append(message['message']['payload'])
+            else:
+                # Lần đầu: App tải danh sách qua /api/notifications/list, chỉ cần mốc bus hiện tại
+                last = Bus._bus_last_id()
+
+            unread_count = env_su['res.users'].browse(int(user_id)).qr_unread_notification_count
+
+            return {
+                'status': 'success',
+                'notifications': notifications,
+                'last': last,
+                'unread_count': unread_count,
+                'poll_interval': NOTIFICATION_POLL_INTERVAL,
+            }
+        except Exception as e:
+            _logger.error("Poll Notifications Error: %s", str(e), exc_info=True)
+            return {'status': 'error', 'message': str(e)}
+
+    @http.route('/api/notifications/mark_read', type='json', auth='none', methods=['POST'], csrf=False)
+    @api_logged
+    @compact_response
+    @admission_control
+    @mobile_auth
+    def mark_notifications_read(self, **params):
+        """Đánh dấu đã đọc thông báo
+
+        Params:
+            notification_ids: danh sách id thông báo (bỏ trống để đánh dấu tất cả)
+        """
+        try:
+            user_id = request.env.uid
+            env_su = api.Environment(request.cr, SUPERUSER_ID, {})
+
+            domain = [
+                ('recipient_user_id', '=', int(user_id)),
+                ('is_read', '!=', True),
+            ]
+            notification_ids = params.get('notification_ids')
+            if notification_ids:
+                domain.append(('id', 'in', [int(nid) for nid in notification_ids]))
+            env_su['qr_scan.notification'].search(domain).write({'is_read': True})
+
+            return {
+                'status': 'success',
+                'unread_count': env_su['res.users'].browse(int(user_id)).qr_unread_notification_count,
+            }
+        except Exception as e:
+            _logger.error("Mark Notifications Read Error: %s", str(e), exc_info=True)
+            return {'status': 'error', 'message': str(e)}
+
     @http.route('/api/notifications/respond', type='json', auth='none', methods=['POST'], csrf=False)
+    @api_logged
+    @compact_response
+    @admission_control
+    @mobile_auth
     def respond_notification(self, **params):
         """Phản hồi thông báo (Accept/Decline reassignment request)"""
         try:
-            # Lấy user từ session
-            user_id = request.session.uid if getattr(request.session, 'uid', False) else None
-            if not user_id:
-                return {
-                    'status': 'error',
-                    'message': 'Phiên đăng nhập hết hạn. Vui lòng đăng nhập lại.',
-                    'error_code': 'SESSION_EXPIRED'
-                }
+            user_id = request.env.uid
             
             notification_id = params.get('notification_id')
             action = params.get('action')  # 'accept' or 'decline'
@@ -911,3 +1161,96 @@ class QRScanAPI(http.Controller):
             _logger.error("Respond Notification Error: %s", str(e), exc_info=True)
             return {'status': 'error', 'message': str(e)}
 
+
+    @http.route('/api/batch', type='json', auth='none', methods=['POST'], csrf=False)
+    @api_logged
+    @compact_response
+    @admission_control
+    @mobile_auth
+    def batch(self, **params):
+        """Gọi nhiều API của App trong một request để giảm số lượt round-trip
+
+        Params:
+            calls: danh sách {id, path, params}, path là route trong BATCH_ROUTES
+            atomic: True để chạy tất cả trong một transaction chung; lời gọi đầu tiên
+                lỗi sẽ hoàn tác toàn bộ và các lời gọi sau bị bỏ qua
+        Returns:
+            results: danh sách {id, path, result} theo đúng thứ tự calls
+        """
+        try:
+            calls = params.get('calls') or []
+            if not isinstance(calls, list) or not calls:
+                return {'status': 'error', 'message': 'Thiếu danh sách calls'}
+            if len(calls) > BATCH_MAX_CALLS:
+                return {'status': 'error', 'message': f'Tối đa {BATCH_MAX_CALLS} lời gọi mỗi batch'}
+            for call in calls:
+                if not isinstance(call, dict) or call.get('path') not in BATCH_ROUTES:
+                    return {'status': 'error', 'message': f'Route không hỗ trợ trong batch: {call.get("path") if isinstance(call, dict) else call}'}
+
+            if params.get('atomic'):
+                results = self._run_batch_atomic(calls)
+            else:
+                results = [self._run_batch_call(call) for call in calls]
+
+            return {
+                'status': 'success',
+                'results': results,
+            }
+        except Exception as e:
+            _logger.error("Batch API Error: %s", str(e), exc_info=True)
+            return {'status': 'error', 'message': str(e)}
+
+    def _call_batch_handler(self, call):
+        handler = getattr(self, BATCH_ROUTES[call['path']])
+        # Log của lời gọi con mang route thật của nó, không phải /api/batch
+        with logged_route(call['path']):
+            result = handler(**(call.get('params') or {}))
+        if isinstance(result, dict) and result.get('status') == 'error':
+            raise _BatchCallFailed(result)
+        return result
+
+    def _run_batch_call(self, call):
+        """Mỗi lời gọi chạy trong savepoint riêng, lỗi chỉ hoàn tác lời gọi đó"""
+        try:
+            with request.env.cr.savepoint():
+                result = self._call_batch_handler(call)
+        except _BatchCallFailed as e:
+            result = e.result
+        except Exception as e:
+            _logger.error("Batch call %s Error: %s", call['path'], str(e), exc_info=True)
+            result = {'status': 'error', 'message': str(e)}
+        return {'id': call.get('id'), 'path': call['path'], 'result': result}
+
+    def _run_batch_atomic(self, calls):
+        """Tất cả lời gọi chung một savepoint: lỗi đầu tiên hoàn tác toàn bộ batch"""
+        results = []
+        try:
+            with request.env.cr.savepoint():
+                for call in calls:
+                    results.append({'id': call.get('id'), 'path': call['path'], 'result': self._call_batch_handler(call)})
+        except Exception as e:
+            # Lỗi khi giải phóng savepoint (flush) được gán cho lời gọi cuối cùng
+            failed_index = min(len(results), len(calls) - 1)
+            results = results[:failed_index]
+            failed = calls[failed_index]
+            if isinstance(e, _BatchCallFailed):
+                error = e.result
+            else:
+                _logger.error("Batch call %s Error: %s", failed['path'], str(e), exc_info=True)
+                error = {'status': 'error', 'message': str(e)}
+            rolled_back = {'status': 'error', 'message': 'Đã hoàn tác do lời gọi khác trong batch bị lỗi', 'error_code': 'BATCH_ROLLED_BACK'}
+            skipped = {'status': 'error', 'message': 'Bỏ qua do lời gọi trước trong batch bị lỗi', 'error_code': 'BATCH_SKIPPED'}
+            results = (
+                [dict(res, result=dict(rolled_back)) for res in results]
+                + [{'id': failed.get('id'), 'path': failed['path'], 'result': error}]
+                + [{'id': call.get('id'), 'path': call['path'], 'result': dict(skipped)} for call in calls[failed_index + 1:]]
+            )
+        return results
+
+
+class _BatchCallFailed(Exception):
+    """Lời gọi con trả về status 'error', dùng để hoàn tác savepoint của nó"""
+
+    def __init__(self, result):
+        super().__init__(result.get('message'))
+        self.result = result
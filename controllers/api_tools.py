@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+import contextlib
+import functools
+import hashlib
+import json
+import logging
+import math
+import random
+import time
+
+from odoo.http import request
+
+from .cache_utils import TokenBucketLimiter
+
+_logger = logging.getLogger(__name__)
+
+# Tỉ lệ (0..1) ghi log chi tiết params đã che dữ liệu nhị phân, cấu hình qua System Parameters
+LOG_SAMPLE_RATE_PARAM = 'qr_scan_odoo_18.api_log_sample_rate'
+
+# Các khóa chứa dữ liệu nhạy cảm/nhị phân (mật khẩu, ảnh base64...) không bao giờ ghi ra log
+REDACTED_KEYS = {'password', 'token', 'data', 'datas', 'image', 'signature'}
+MAX_LOG_STRING = 200
+MAX_LOG_ITEMS = 20
+
+
+def redact_payload(value, key=None):
+    """Rút gọn payload trước khi ghi log: che khóa nhạy cảm, cắt chuỗi và danh sách dài."""
+    if key in REDACTED_KEYS and value:
+        size = len(value) if isinstance(value, (str, bytes)) else 0
+        return '<redacted %s chars>' % size if size else '<redacted>'
+    if isinstance(value, dict):
+        return {k: redact_payload(v, k) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        items = [redact_payload(v) for v in value[:MAX_LOG_ITEMS]]
+        if len(value) > MAX_LOG_ITEMS:
+            items.append('<%s more items>' % (len(value) - MAX_LOG_ITEMS))
+        return items
+    if isinstance(value, bytes):
+        return '<%s bytes>' % len(value)
+    if isinstance(value, str) and len(value) > MAX_LOG_STRING:
+        return '%s...<%s chars>' % (value[:MAX_LOG_STRING], len(value))
+    return value
+
+
+def _get_log_sample_rate():
+    try:
+        return float(request.env['ir.config_parameter'].sudo().get_param(LOG_SAMPLE_RATE_PARAM, 0.0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _get_log_user_id():
+    env = getattr(request, 'env', None)
+    uid = env.uid if env is not None else None
+    return uid or getattr(request.session, 'uid', None)
+
+
+def _get_log_route():
+    """Route ghi log: route của lời gọi con khi đang chạy trong /api/batch, ngược lại path của request"""
+    return getattr(request, 'qr_api_route', None) or request.httprequest.path
+
+
+@contextlib.contextmanager
+def logged_route(path):
+    """Ghi log (và lấy mẫu params) các handler gọi bên trong theo ``path`` thay vì path của request"""
+    previous = getattr(request, 'qr_api_route', None)
+    request.qr_api_route = path
+    try:
+        yield
+    finally:
+        request.qr_api_route = previous
+
+
+def api_logged(func):
+    """Ghi một dòng log có cấu trúc cho mỗi lần gọi API mobile.
+
+    Gồm route, user, picking_id, kích thước payload, thời gian xử lý và kết quả.
+    Params chỉ được dump (đã che ảnh/mật khẩu) theo tỉ lệ lấy mẫu cấu hình.
+    """
+    @functools.wraps(func)
+    def wrapper(self, *args, **params):
+        route = _get_log_route()
+        started = time.monotonic()
+        outcome = 'exception'
+        error_code = None
+        try:
+            result = func(self, *args, **params)
+            if isinstance(result, dict):
+                outcome = result.get('status') or 'ok'
+                error_code = result.get('error_code')
+            else:
+                outcome = 'ok'
+            return result
+        finally:
+            httprequest = request.httprequest
+            level = logging.INFO if outcome in ('success', 'not_modified', 'ok') else logging.WARNING
+            _logger.log(
+                level,
+                "api route=%s user=%s picking=%s size=%s duration_ms=%.1f outcome=%s error_code=%s",
+                route,
+                _get_log_user_id(),
+                params.get('picking_id'),
+                httprequest.content_length or 0,
+                (time.monotonic() - started) * 1000,
+                outcome,
+                error_code,
+            )
+            sample_rate = _get_log_sample_rate()
+            if sample_rate > 0 and random.random() < sample_rate:
+                _logger.info(
+                    "api payload route=%s params=%s",
+                    route,
+                    json.dumps(redact_payload(params), ensure_ascii=False, default=str),
+                )
+    return wrapper
+
+
+SESSION_EXPIRED_RESPONSE = {
+    'status': 'error',
+    'message': 'Phiên đăng nhập hết hạn. Vui lòng đăng nhập lại.',
+    'error_code': 'SESSION_EXPIRED',
+}
+
+
+def get_device_token():
+    """Token thiết bị gửi qua header 'Authorization: Bearer <token>' hoặc 'X-Device-Token'."""
+    headers = request.httprequest.headers
+    authorization = headers.get('Authorization', '')
+    if authorization.lower().startswith('bearer '):
+        return authorization[7:].strip()
+    return headers.get('X-Device-Token') or None
+
+
+def authenticate_mobile_request():
+    """Xác định user của request mobile: ưu tiên token thiết bị, sau đó tới session Odoo."""
+    token = get_device_token()
+    if token:
+        return request.env['qr_scan.device.token'].sudo()._check_token(token)
+    return getattr(request.session, 'uid', None) or False
+
+
+def mobile_auth(func):
+    """Thay cho việc kiểm tra request.session.uid lặp lại ở từng route auth='none'.
+
+    Khi xác thực thành công, request.env được chuyển sang user tương ứng (request.env.uid);
+    ngược lại trả về lỗi SESSION_EXPIRED chung cho App.
+    """
+    @functools.wraps(func)
+    def wrapper(self, *args, **params):
+        uid = authenticate_mobile_request()
+        if not uid:
+            _logger.warning("Session expired or missing in %s", request.httprequest.path)
+            return dict(SESSION_EXPIRED_RESPONSE)
+        request.update_env(user=uid)
+        return func(self, *args, **params)
+    return wrapper
+
+
+def compact_response(func):
+    """Giữ lại kết quả Python của route JSON trên request.
+
+    ir.http._post_dispatch dùng kết quả này để mã hóa MessagePack trực tiếp khi App yêu cầu,
+    không phải parse lại body JSON đã serialize.
+    """
+    @functools.wraps(func)
+    def wrapper(self, *args, **params):
+        result = func(self, *args, **params)
+        request.qr_api_result = result
+        return result
+    return wrapper
+
+
+# Giới hạn tần suất theo thiết bị/user và theo route: tên hàm -> (token mỗi giây, burst)
+DEFAULT_RATE_LIMIT = (5.0, 30)
+RATE_LIMITS = {
+    'login': (0.2, 5),
+    'picking_detail': (2.0, 20),
+    'parse_qr_code': (2.0, 20),
+    'picking_prepare': (1.0, 10),
+    'picking_package': (1.0, 10),
+    'complete_delivery': (1.0, 10),
+}
+# Các route nặng bị giới hạn số request chạy đồng thời trên toàn hệ thống
+HEAVY_ROUTES = {'picking_prepare', 'picking_package', 'complete_delivery'}
+HEAVY_CONCURRENCY_PARAM = 'qr_scan_odoo_18.heavy_route_concurrency'
+DEFAULT_HEAVY_CONCURRENCY = 4
+# Namespace (int4) cho pg_try_advisory_xact_lock của các slot route nặng
+HEAVY_LOCK_NAMESPACE = 0x51525343
+HEAVY_RETRY_AFTER = 2
+
+RATE_LIMITER = TokenBucketLimiter()
+
+
+def _rate_limit_client_key():
+    """Định danh client: token thiết bị (chỉ khi đúng chữ ký), session uid hoặc IP.
+
+    Token sai chữ ký bị tính theo IP, để client đổi token giả liên tục không được bucket mới
+    (và không đẩy bucket của client thật ra khỏi LRU).
+    """
+    token = get_device_token()
+    if token and request.env['qr_scan.device.token'].sudo()._verify_signature(token):
+        return 'token:%s' % hashlib.sha256(token.encode()).hexdigest()[:16]
+    uid = getattr(request.session, 'uid', None)
+    if uid:
+        return 'user:%s' % uid
+    return 'ip:%s' % request.httprequest.remote_addr
+
+
+def rate_limited_response(retry_after):
+    return {
+        'status': 'error',
+        'message': 'Hệ thống đang bận, vui lòng thử lại sau %s giây.' % retry_after,
+        'error_code': 'RATE_LIMITED',
+        'retry_after': retry_after,
+    }
+
+
+def _acquire_heavy_slot():
+    """Giữ một trong N slot advisory lock tới hết transaction; False nếu tất cả đang bận"""
+    try:
+        slots = int(request.env['ir.config_parameter'].sudo().get_param(
+            HEAVY_CONCURRENCY_PARAM, DEFAULT_HEAVY_CONCURRENCY))
+    except (TypeError, ValueError):
+        slots = DEFAULT_HEAVY_CONCURRENCY
+    if slots <= 0:
+        return True
+    request.env.cr.execute("""
+        SELECT slot
+          FROM generate_series(0, %s - 1) AS slot
+         WHERE pg_try_advisory_xact_lock(%s, slot)
+         LIMIT 1
+    """, [slots, HEAVY_LOCK_NAMESPACE])
+    return bool(request.env.cr.fetchone())
+
+
+def admission_control(func):
+    """Giới hạn tần suất (token bucket) theo client + route và số request đồng thời của route nặng.
+
+    Đặt ngoài @mobile_auth để chặn vòng lặp của App trước khi tốn chi phí xác thực.
+    Khi bị chặn, trả về ngay lỗi RATE_LIMITED kèm retry_after (giây); ir.http gắn thêm header Retry-After.
+    """
+    route_key = func.__name__
+    rate, burst = RATE_LIMITS.get(route_key, DEFAULT_RATE_LIMIT)
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **params):
+        allowed, retry_after = RATE_LIMITER.consume((_rate_limit_client_key(), route_key), rate, burst)
+        if not allowed:
+            return rate_limited_response(max(1, math.ceil(retry_after)))
+        if route_key in HEAVY_ROUTES and not _acquire_heavy_slot():
+            return rate_limited_response(HEAVY_RETRY_AFTER)
+        return func(self, *args, **params)
+    return wrapper
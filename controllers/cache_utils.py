@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache(object):
+    """Cache LRU nhỏ trong bộ nhớ worker, an toàn với nhiều thread.
+
+    Dùng cho các response API được tính lại nhiều lần với cùng khóa.
+    ``ttl`` (giây) là tùy chọn: khi có, các entry quá hạn được coi như không tồn tại.
+    """
+
+    def __init__(self, maxsize=128, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+        self._key_locks = {}
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key, factory, cacheable=None):
+        """Lấy giá trị từ cache, nếu chưa có thì tính bằng ``factory()`` và lưu lại.
+
+        Các thread cùng hỏi một khóa chưa có trong cache sẽ chờ nhau, chỉ một thread tính toán.
+        ``cacheable(value)`` (tùy chọn) quyết định có lưu kết quả hay không (ví dụ bỏ qua lỗi).
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            try:
+                value = self.get(key, _MISSING)
+                if value is _MISSING:
+                    value = factory()
+                    if cacheable is None or cacheable(value):
+                        self.set(key, value)
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+        return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return entry[0] if entry is not None else default
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TokenBucketLimiter(object):
+    """Giới hạn tần suất kiểu token bucket, trạng thái giữ trong bộ nhớ worker.
+
+    Mỗi khóa có ``burst`` token, hồi lại ``rate`` token mỗi giây; mỗi lần gọi tiêu 1 token.
+    Chỉ giữ tối đa ``maxsize`` khóa gần nhất để bộ nhớ không tăng mãi.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, rate, burst):
+        """Trả về (allowed, retry_after giây)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (float(burst), now))
+            tokens = min(float(burst), tokens + (now - updated_at) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return allowed, 0 if allowed else (1 - tokens) / rate
@@ -1,17 +1,85 @@
 # -*- coding: utf-8 -*-
 from odoo import http, fields
-from odoo.http import request
+from odoo.http import request, Response, content_disposition
+from odoo.tools import SQL
+from werkzeug.security import safe_join
+import functools
 import json
 import os
 from odoo.modules import get_resource_path
 from datetime import datetime, timedelta
 
+from .api_tools import compact_response
+from .cache_utils import LRUCache
+from ..models.stock_picking_qr import DASHBOARD_BUS_CHANNEL, fold_search_text
+from ..services.dashboard_row_serializer import LIST_ROW_FIELDS, DELIVERY_ROW_FIELDS, row_fields_schema
+from .dashboard_export import (
+    EXPORT_CONTENT_TYPES, LIST_EXPORT_COLUMNS, DELIVERY_EXPORT_COLUMNS,
+    iter_export_chunks, stream_csv, stream_xlsx,
+)
+from .dashboard_static import (
+    DASHBOARD_ASSET_ROUTE, IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL,
+    dashboard_static_dir, load_dashboard_shell, load_static_file, static_file_response,
+)
+
+# Bộ đếm tab theo user và bộ lọc, dùng lại giữa các lần tải trong vài giây
+FACET_CACHE = LRUCache(maxsize=256, ttl=5)
+# Các chiều được đếm: khóa trong filters -> field của stock.picking
+FACET_DIMENSIONS = (
+    ('scan_type', 'latest_scan_type'),
+    ('state', 'state'),
+    ('ship_inf_state', 'ship_inf_state'),
+)
+
+# Response danh sách dashboard theo user (quy tắc truy cập phiếu khác nhau), khóa theo thế hệ dữ liệu
+DASHBOARD_RESPONSE_CACHE = LRUCache(maxsize=128, ttl=60)
+
+
+def _normalize_cache_params(value):
+    """Bỏ các tham số rỗng để các request tương đương có cùng khóa cache"""
+    if isinstance(value, dict):
+        return {key: _normalize_cache_params(item) for key, item in value.items() if item not in (None, '', {}, [])}
+    return value
+
+
+def dashboard_cached(func):
+    """Cache response thành công của API danh sách dashboard.
+
+    Khóa gồm endpoint, tham số đã chuẩn hóa, user (record rule), múi giờ / ngôn ngữ / công ty và thế hệ dữ liệu
+    (tăng sau mỗi commit thay đổi field dashboard đọc hoặc lịch sử quét). Thế hệ được đọc trong
+    snapshot của request nên không thể lưu dữ liệu cũ dưới thế hệ mới.
+    Các request giống nhau cùng lúc chỉ tính một lần.
+    """
+    @functools.wraps(func)
+    def wrapper(self, **kwargs):
+        env = request.env
+        key = (
+            env.cr.dbname,
+            func.__name__,
+            env.uid,
+            env['stock.picking']._qr_dashboard_generation(),
+            env.user.tz or 'UTC',
+            env.lang,
+            tuple(env.companies.ids),
+            json.dumps(_normalize_cache_params(kwargs), sort_keys=True, default=str),
+        )
+        return DASHBOARD_RESPONSE_CACHE.get_or_set(
+            key,
+            lambda: func(self, **kwargs),
+            cacheable=lambda result: isinstance(result, dict) and result.get('status') == 'success',
+        )
+    return wrapper
+
 
 class StockPickingDashboardAPI(http.Controller):
     
     @http.route('/dashboard/stock_picking', type='http', auth='user', website=False, sitemap=False)
     def render_dashboard(self, **kwargs):
-        """Phục vụ file index.html của React Dashboard"""
+        """Phục vụ file index.html của React Dashboard
+
+        Nội dung được giữ trong bộ nhớ worker và chỉ đọc lại khi file thay đổi (mtime);
+        URL bundle trong HTML được đổi sang URL có hash nội dung để trình duyệt cache lâu dài.
+        """
         # Đường dẫn tới file index.html trong static
         path = get_resource_path('qr_scan_odoo_18', 'static', 'dashboard', 'index.html')
         
@@ -19,11 +87,20 @@ class StockPickingDashboardAPI(http.Controller):
             return "<h3>Lỗi: Không tìm thấy file Dashboard!</h3><p>Vui lòng kiểm tra thư mục 'static/dashboard' trong module 'qr_scan_odoo_18'.</p>"
             
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                html_content = f.read()
-            return html_content
+            return static_file_response(load_dashboard_shell(path), REVALIDATE_CACHE_CONTROL)
         except Exception as e:
             return "<h3>Lỗi hệ thống:</h3><p>%s</p>" % str(e)
+
+    @http.route(DASHBOARD_ASSET_ROUTE + '/<string:content_hash>/<path:filename>', type='http', auth='public', website=False, sitemap=False)
+    def dashboard_static_file(self, content_hash, filename, **kwargs):
+        """File tĩnh của React Dashboard theo URL có hash nội dung (bundle JS/CSS, icon...)"""
+        path = safe_join(dashboard_static_dir(), filename)
+        if not path or not os.path.isfile(path):
+            return request.not_found()
+        entry = load_static_file(path)
+        # Hash cũ (HTML cũ còn trong cache trình duyệt): vẫn trả nội dung mới nhưng không cache lâu dài
+        cache_control = IMMUTABLE_CACHE_CONTROL if entry['hash'] == content_hash else REVALIDATE_CACHE_CONTROL
+        return static_file_response(entry, cache_control)
     
     # Mapping trạng thái sang tiếng Việt
     STATE_LABELS_VI = {
@@ -44,9 +121,94 @@ class StockPickingDashboardAPI(http.Controller):
         'delivery_complete': 'Hoàn thành',
     }
     
+    def _row_labels(self):
+        """Nhãn tiếng Việt dùng khi dựng dòng dashboard"""
+        return {'state': self.STATE_LABELS_VI, 'scan_type': self.SCAN_TYPE_LABELS_VI}
+
+    def _build_picking_domain(self, filters, search_term, search_field, skip_filters=()):
+        """Domain danh sách phiếu xuất theo bộ lọc và ô tìm kiếm của dashboard.
+
+        skip_filters: các khóa trong filters bỏ qua (facets tự xử lý các chiều được đếm)
+        """
+        filters = {key: value for key, value in (filters or {}).items() if key not in skip_filters}
+        domain = [('picking_type_code', '=', 'outgoing')]
+        
+        # Filter by scan_type - CẬP NHẬT để lọc theo trạng thái mới nhất
+        if filters.get('scan_type'):
+            domain.append(('latest_scan_type', '=', filters['scan_type']))
+        
+        # Filter by state
+        if filters.get('state'):
+            domain.append(('state', '=', filters['state']))
+        
+        # Filter by trạng thái giao vận
+        if filters.get('ship_inf_state'):
+            domain.append(('ship_inf_state', '=', filters['ship_inf_state']))
+        
+        # Filter by date
+        if filters.get('date_from'):
+            domain.append(('scheduled_date', '>=', filters['date_from']))
+        if filters.get('date_to'):
+            domain.append(('scheduled_date', '<=', filters['date_to']))
+        
+        # Search theo field cụ thể
+        if search_term:
+            if search_field == 'date':
+                # Search theo ngày (scheduled_date)
+                domain.append(('scheduled_date', 'ilike', search_term))
+            elif search_field == 'sale_order':
+                # Search theo mã SO
+                domain.append(('sale_id.name', 'ilike', search_term))
+            elif search_field == 'picking_name':
+                # Search theo mã phiếu
+                domain.append(('name', 'ilike', search_term))
+            elif search_field == 'customer':
+                # Search theo khách hàng
+                domain.append(('partner_id.name', 'ilike', search_term))
+            elif search_field == 'shipping_method':
+                # Search theo loại vận chuyển
+                domain.append(('shipping_method.name', 'ilike', search_term))
+            else:
+                # Search tất cả (mặc định): mã phiếu, nguồn, khách hàng, SO, NVKD, vận chuyển
+                # qua cột dashboard_search_text đã bỏ dấu (index trigram)
+                domain.append(('dashboard_search_text', 'ilike', fold_search_text(search_term)))
+        return domain
+
+    def _build_prepared_deliveries_domain(self, filters):
+        """Domain danh sách đơn gửi xe (dùng chung cho API danh sách và export)"""
+        # Chỉ lấy đơn có phương thức vận chuyển là Xe tải, Xe bus hoặc Grab
+        domain = [
+            ('picking_type_code', '=', 'outgoing'),
+            ('is_tracked_shipping', '=', True),
+        ]
+        
+        # Filter by stock picking state for shipping tabs:
+        # - Chưa xuất: state != done
+        # - Đã xuất: state = done, optionally combined with ship_inf_state = none
+        if filters.get('state') == 'not_printed':
+            domain.append(('sale_assigned_date', '!=', False))
+            domain.append(('warehouse_acknowledged', '=', False))
+            domain.append(('state', 'not in', ['done', 'cancel']))
+        elif filters.get('state') == 'not_done':
+            domain.append(('state', '!=', 'assigned'))
+        elif filters.get('state'):
+            domain.append(('state', '=', filters['state']))
+        
+        # Filter by ship_inf_state (none, received hoặc not_received)
+        if filters.get('ship_inf_state'):
+            domain.append(('ship_inf_state', '=', filters['ship_inf_state']))
+        return domain
+
     @http.route('/api/dashboard/stock_picking/list', type='json', auth='user', methods=['POST'], csrf=False, cors='*')
+    @compact_response
+    @dashboard_cached
     def get_picking_list(self, **kwargs):
-        """API lấy danh sách phiếu giao hàng"""
+        """API lấy danh sách phiếu giao hàng
+
+        Phân trang keyset: gửi lại 'cursor' = next_cursor của trang trước.
+        'page' vẫn được hỗ trợ (OFFSET) khi không có cursor.
+        'fields' (tùy chọn): chỉ trả về các field này, xem /api/dashboard/stock_picking/list/schema.
+        """
         try:
             # Lấy parameters từ request
             filters = kwargs.get('filters', {})
@@ -54,123 +216,28 @@ class StockPickingDashboardAPI(http.Controller):
             search_field = kwargs.get('search_field', 'all')
             page = kwargs.get('page', 1)
             limit = kwargs.get('limit', 50)
+            cursor = kwargs.get('cursor')
             sort_by = kwargs.get('sort_by', 'date')  # 'date', 'scan_type'
             sort_order = kwargs.get('sort_order', 'desc')  # 'asc', 'desc'
             
             # Build domain
-            domain = [('picking_type_code', '=', 'outgoing')]
-            
-            # Filter by scan_type - CẬP NHẬT để lọc theo trạng thái mới nhất
-            if filters.get('scan_type'):
-                domain.append(('latest_scan_type', '=', filters['scan_type']))
-            
-            # Filter by state
-            if filters.get('state'):
-                domain.append(('state', '=', filters['state']))
-            
-            # Filter by date
-            if filters.get('date_from'):
-                domain.append(('scheduled_date', '>=', filters['date_from']))
-            if filters.get('date_to'):
-                domain.append(('scheduled_date', '<=', filters['date_to']))
-            
-            # Search theo field cụ thể
-            if search_term:
-                if search_field == 'date':
-                    # Search theo ngày (scheduled_date)
-                    domain.append(('scheduled_date', 'ilike', search_term))
-                elif search_field == 'sale_order':
-                    # Search theo mã SO
-                    domain.append(('sale_id.name', 'ilike', search_term))
-                elif search_field == 'picking_name':
-                    # Search theo mã phiếu
-                    domain.append(('name', 'ilike', search_term))
-                elif search_field == 'customer':
-                    # Search theo khách hàng
-                    domain.append(('partner_id.name', 'ilike', search_term))
-                elif search_field == 'shipping_method':
-                    # Search theo loại vận chuyển
-                    domain.append(('shipping_method.name', 'ilike', search_term))
-                else:
-                    # Search tất cả (mặc định)
-                    domain.extend([
-                        '|', '|', '|', '|', '|',
-                        ('name', 'ilike', search_term),
-                        ('origin', 'ilike', search_term),
-                        ('partner_id.name', 'ilike', search_term),
-                        ('sale_id.name', 'ilike', search_term),
-                        ('sale_id.user_id.name', 'ilike', search_term),
-                        ('shipping_method.name', 'ilike', search_term)
-                    ])
+            domain = self._build_picking_domain(filters, search_term, search_field)
             
             # Get pickings với pagination - TỐI ƯU query
             Picking = request.env['stock.picking']
             total_count = Picking.search_count(domain)
             
-            # Sắp xếp: Ưu tiên assigned_task_date ASC (cũ nhất trước), NULL cuối cùng
-            # Sau đó mới đến scheduled_date DESC
-            order_clause = 'assigned_task_date ASC NULLS LAST, scheduled_date DESC'
-            
-            # Fetch với prefetch để giảm số lần query database
-            pickings = Picking.search(
-                domain, 
-                limit=limit, 
-                offset=(page - 1) * limit, 
-                order=order_clause
+            # Sắp xếp hoàn toàn trong SQL (kể cả theo trạng thái quét), phân trang keyset theo cursor
+            pickings, next_cursor = Picking._qr_dashboard_search_page(
+                domain, sort_by, sort_order, limit,
+                cursor=cursor,
+                offset=0 if cursor else (page - 1) * limit,
             )
             
-            # Prefetch related fields để tránh N+1 query problem
-            pickings.mapped('sale_id.name')
-            pickings.mapped('sale_id.user_id.name')
-            pickings.mapped('partner_id.name')
-            pickings.mapped('shipping_method.name')
-            pickings.mapped('delivery_note')  # Prefetch delivery note
-            
-            # Prepare data
-            data = []
-            for picking in pickings:
-                # Get latest scan type - chỉ fetch 1 record
-                latest_scan = picking.scan_history_ids.sorted('scan_date', reverse=True)[:1]
-                latest_scan_type = latest_scan.scan_type if latest_scan else False
-                latest_scan_type_label = self.SCAN_TYPE_LABELS_VI.get(latest_scan_type, '')
-                
-                # Get state label - sử dụng tiếng Việt
-                state_label = self.STATE_LABELS_VI.get(picking.state, picking.state)
-                
-                # Sort priority cho scan_type: Đã giao việc -> Chuẩn bị -> Đóng gói
-                scan_type_priority = {
-                    'assigned_task': 1,
-                    'prepare': 2,
-                    'shipping': 3,
-                }.get(latest_scan_type, 99)
-                
-                # Chuyển đổi múi giờ từ UTC trong DB sang múi giờ người dùng
-                scheduled_date_local = fields.Datetime.context_timestamp(request.env.user, picking.scheduled_date) if picking.scheduled_date else None
-                assigned_date_local = fields.Datetime.context_timestamp(request.env.user, picking.assigned_task_date) if picking.assigned_task_date else None
-                
-                data.append({
-                    'id': picking.id,
-                    'name': picking.name,
-                    'date': scheduled_date_local.strftime('%Y-%m-%d %H:%M:%S') if scheduled_date_local else '',
-                    'sale_order': picking.sale_id.name if picking.sale_id else '',
-                    'customer': picking.partner_id.name if picking.partner_id else '',
-                    'salesperson': picking.sale_id.user_id.name if picking.sale_id and picking.sale_id.user_id else '',
-                    'shipping_method': picking.shipping_method.name if picking.shipping_method else '',
-                    'scan_type': latest_scan_type,
-                    'scan_type_label': latest_scan_type_label,
-                    'scan_type_priority': scan_type_priority,
-                    'state': picking.state,
-                    'state_label': state_label,
-                    'origin': picking.origin or '',
-                    'note': picking.delivery_note or '',  # Sử dụng delivery_note thay vì note
-                    'assigned_task_date': assigned_date_local.strftime('%Y-%m-%d %H:%M:%S') if assigned_date_local else '',
-                    'sale_id': picking.sale_id.id if picking.sale_id else False,
-                })
-            
-            # Apply sorting nếu sort_by = 'scan_type'
-            if sort_by == 'scan_type':
-                reverse = (sort_order == 'desc')
-                data.sort(key=lambda x: x['scan_type_priority'], reverse=reverse)
+            # Dựng dòng bằng một câu SQL projection (chỉ các cột cần), múi giờ tính một lần
+            data = request.env['stock.picking.dashboard.row.serializer'].serialize(
+                pickings.ids, LIST_ROW_FIELDS, labels=self._row_labels(), field_names=kwargs.get('fields'),
+            )
             
             return {
                 'status': 'success',
@@ -178,7 +245,11 @@ class StockPickingDashboardAPI(http.Controller):
                 'total': total_count,
                 'page': page,
                 'limit': limit,
-                'total_pages': (total_count + limit - 1) // limit
+                'total_pages': (total_count + limit - 1) // limit,
+                'next_cursor': next_cursor,
+                # Dashboard đăng ký kênh bus với mốc này để nhận các thay đổi sau lần tải
+                'bus_channel': DASHBOARD_BUS_CHANNEL,
+                'bus_last_id': request.env['bus.bus'].sudo()._bus_last_id(),
             }
             
         except Exception as e:
@@ -188,8 +259,13 @@ class StockPickingDashboardAPI(http.Controller):
             }
     
     @http.route('/api/dashboard/stock_picking/prepared_deliveries', type='json', auth='user', methods=['POST'], csrf=False, cors='*')
+    @compact_response
+    @dashboard_cached
     def get_prepared_deliveries(self, **kwargs):
-        """API lấy danh sách đơn gửi xe (Xe tải, Xe bus, Grab) - Nâng cấp hỗ trợ filter và pagination"""
+        """API lấy danh sách đơn gửi xe (Xe tải, Xe bus, Grab) - Nâng cấp hỗ trợ filter và pagination
+
+        'fields' (tùy chọn): chỉ trả về các field này, xem /api/dashboard/stock_picking/prepared_deliveries/schema.
+        """
         try:
             # Lấy parameters từ request
             filters = kwargs.get('filters', {})
@@ -197,30 +273,7 @@ class StockPickingDashboardAPI(http.Controller):
             limit = kwargs.get('limit', 50)
             sort_order = kwargs.get('sort_order', 'desc')
             
-            # Build domain - chỉ lấy đơn có phương thức vận chuyển là Xe tải, Xe bus hoặc Grab
-            domain = [
-                ('picking_type_code', '=', 'outgoing'),
-                '|', '|',
-                ('shipping_method.name', 'ilike', 'xe tải'),
-                ('shipping_method.name', 'ilike', 'xe bus'),
-                ('shipping_method.name', 'ilike', 'grab'),
-            ]
-            
-            # Filter by stock picking state for shipping tabs:
-            # - Chưa xuất: state != done
-            # - Đã xuất: state = done, optionally combined with ship_inf_state = none
-            if filters.get('state') == 'not_printed':
-                domain.append(('sale_assigned_date', '!=', False))
-                domain.append(('warehouse_acknowledged', '=', False))
-                domain.append(('state', 'not in', ['done', 'cancel']))
-            elif filters.get('state') == 'not_done':
-                domain.append(('state', '!=', 'assigned'))
-            elif filters.get('state'):
-                domain.append(('state', '=', filters['state']))
-            
-            # Filter by ship_inf_state (none, received hoặc not_received)
-            if filters.get('ship_inf_state'):
-                domain.append(('ship_inf_state', '=', filters['ship_inf_state']))
+            domain = self._build_prepared_deliveries_domain(filters)
             
             # Get pickings với pagination
             Picking = request.env['stock.picking']
@@ -236,79 +289,10 @@ class StockPickingDashboardAPI(http.Controller):
                 order=order_clause
             )
             
-            # Prefetch related fields để tránh N+1 query
-            pickings.mapped('sale_id.name')
-            pickings.mapped('sale_id.user_id.name')
-            pickings.mapped('partner_id.name')
-            pickings.mapped('partner_id.phone')
-            pickings.mapped('partner_id.mobile')
-            pickings.mapped('partner_id.street')
-            pickings.mapped('partner_id.street2')
-            pickings.mapped('partner_id.city')
-            pickings.mapped('shipping_method.name')
-            
-            # Prefetch các trường tùy chọn nếu có
-            if hasattr(Picking, 'recipient_name'):
-                pickings.mapped('recipient_name')
-            if hasattr(Picking, 'recipient_phone'):
-                pickings.mapped('recipient_phone')
-            if hasattr(Picking, 'recipient_address'):
-                pickings.mapped('recipient_address')
-            if hasattr(Picking, 'recipient_info'):
-                pickings.mapped('recipient_info')
-            if hasattr(Picking, 'park_info'):
-                pickings.mapped('park_info')
-            if hasattr(Picking, 'shipping_confirmed_by'):
-                pickings.mapped('shipping_confirmed_by.name')
-            
-            # Prepare data
-            data = []
-            for picking in pickings:
-                
-                # Chuyển đổi múi giờ từ UTC sang múi giờ người dùng
-                scheduled_date_local = fields.Datetime.context_timestamp(request.env.user, picking.scheduled_date) if picking.scheduled_date else None
-                assigned_date_local = fields.Datetime.context_timestamp(request.env.user, picking.assigned_task_date) if picking.assigned_task_date else None
-                
-                # Recipient info với fallback
-                rec_name = getattr(picking, 'recipient_name', '') or getattr(picking, 'recipient_info', '') or (picking.partner_id.name if picking.partner_id else '')
-                rec_phone = getattr(picking, 'recipient_phone', '') or (picking.partner_id.phone or picking.partner_id.mobile if picking.partner_id else '')
-                rec_address = getattr(picking, 'recipient_address', '')
-                if not rec_address and picking.partner_id:
-                    addr_parts = []
-                    if picking.partner_id.street:
-                        addr_parts.append(picking.partner_id.street)
-                    if picking.partner_id.street2:
-                        addr_parts.append(picking.partner_id.street2)
-                    if picking.partner_id.city:
-                        addr_parts.append(picking.partner_id.city)
-                    rec_address = ', '.join(addr_parts)
-                
-                # Vehicle / Shipping info
-                park_info = getattr(picking, 'park_info', '') or ''
-                
-                # Ship info state
-                ship_inf_state = picking.ship_inf_state if hasattr(picking, 'ship_inf_state') else ''
-                
-                data.append({
-                    'id': picking.id,
-                    'name': picking.name,
-                    'date': scheduled_date_local.strftime('%Y-%m-%d %H:%M:%S') if scheduled_date_local else '',
-                    'sale_order': picking.sale_id.name if picking.sale_id else '',
-                    'customer': picking.partner_id.name if picking.partner_id else '',
-                    'salesperson': picking.sale_id.user_id.name if picking.sale_id and picking.sale_id.user_id else '',
-                    'shipping_method': picking.shipping_method.name if picking.shipping_method else '',
-                    'state': picking.state,
-                    'state_label': self.STATE_LABELS_VI.get(picking.state, picking.state),
-                    'assigned_task_date': assigned_date_local.strftime('%Y-%m-%d %H:%M:%S') if assigned_date_local else '',
-                    'sale_id': picking.sale_id.id if picking.sale_id else False,
-                    'recipient_name': rec_name or '',
-                    'recipient_phone': rec_phone or '',
-                    'recipient_address': rec_address or '',
-                    'park_info': park_info or '',
-                    'ship_inf_state': ship_inf_state,
-                    'shipping_confirmed_by_id': picking.shipping_confirmed_by.id if getattr(picking, 'shipping_confirmed_by', False) else False,
-                    'shipping_confirmed_by_name': picking.shipping_confirmed_by.name if getattr(picking, 'shipping_confirmed_by', False) else '',
-                })
+            # Dựng dòng bằng một câu SQL projection: thông tin người nhận lấy fallback từ khách hàng
+            data = request.env['stock.picking.dashboard.row.serializer'].serialize(
+                pickings.ids, DELIVERY_ROW_FIELDS, labels=self._row_labels(), field_names=kwargs.get('fields'),
+            )
             
             return {
                 'status': 'success',
@@ -325,7 +309,68 @@ class StockPickingDashboardAPI(http.Controller):
                 'message': str(e)
             }
 
+    @http.route('/api/dashboard/stock_picking/list/schema', type='json', auth='user', methods=['POST'], csrf=False, cors='*')
+    @compact_response
+    def get_picking_list_schema(self, **kwargs):
+        """Các field có thể chọn qua tham số 'fields' của API danh sách phiếu giao hàng"""
+        return {'status': 'success', 'fields': row_fields_schema(LIST_ROW_FIELDS)}
+
+    @http.route('/api/dashboard/stock_picking/prepared_deliveries/schema', type='json', auth='user', methods=['POST'], csrf=False, cors='*')
+    @compact_response
+    def get_prepared_deliveries_schema(self, **kwargs):
+        """Các field có thể chọn qua tham số 'fields' của API danh sách đơn gửi xe"""
+        return {'status': 'success', 'fields': row_fields_schema(DELIVERY_ROW_FIELDS)}
+
+    @http.route('/api/dashboard/stock_picking/export', type='http', auth='user', methods=['GET', 'POST'], csrf=False)
+    def export_picking_list(self, file_format='xlsx', filters='{}', search='', search_field='all',
+                            sort_by='date', sort_order='desc', **kwargs):
+        """Export danh sách phiếu giao hàng (cùng bộ lọc với /list) ra CSV hoặc XLSX.
+
+        filters: JSON giống tham số 'filters' của API danh sách.
+        """
+        try:
+            domain = self._build_picking_domain(json.loads(filters or '{}'), search, search_field)
+            id_query = request.env['stock.picking']._qr_dashboard_id_query(domain, sort_by, sort_order)
+            return self._export_response(
+                file_format, id_query, LIST_ROW_FIELDS, LIST_EXPORT_COLUMNS, 'phieu_giao_hang',
+            )
+        except Exception as e:
+            return request.make_json_response({'status': 'error', 'message': str(e)}, status=400)
+
+    @http.route('/api/dashboard/stock_picking/prepared_deliveries/export', type='http', auth='user', methods=['GET', 'POST'], csrf=False)
+    def export_prepared_deliveries(self, file_format='xlsx', filters='{}', **kwargs):
+        """Export danh sách đơn gửi xe (cùng bộ lọc với /prepared_deliveries) ra CSV hoặc XLSX"""
+        try:
+            domain = self._build_prepared_deliveries_domain(json.loads(filters or '{}'))
+            query = request.env['stock.picking']._search(domain, order='scheduled_date DESC, id DESC')
+            id_query = query.select(SQL.identifier(query.table, 'id'))
+            return self._export_response(
+                file_format, id_query, DELIVERY_ROW_FIELDS, DELIVERY_EXPORT_COLUMNS, 'don_gui_xe',
+            )
+        except Exception as e:
+            return request.make_json_response({'status': 'error', 'message': str(e)}, status=400)
+
+    def _export_response(self, file_format, id_query, row_fields, columns, basename):
+        """Response trả file theo luồng: các dòng được đọc và ghi dần sau khi handler trả về"""
+        if file_format not in EXPORT_CONTENT_TYPES:
+            raise ValueError('Định dạng export không hỗ trợ: %s' % file_format)
+        env = request.env
+        chunks = iter_export_chunks(
+            env.registry, env.uid, dict(env.context), id_query, row_fields, columns, self._row_labels(),
+        )
+        if file_format == 'csv':
+            body = stream_csv(chunks, columns)
+        else:
+            body = stream_xlsx(chunks, columns, basename)
+        filename = '%s_%s.%s' % (basename, fields.Date.context_today(env.user).strftime('%Y%m%d'), file_format)
+        return Response(body, headers=[
+            ('Content-Type', EXPORT_CONTENT_TYPES[file_format]),
+            ('Content-Disposition', content_disposition(filename)),
+            ('Cache-Control', 'no-store'),
+        ], direct_passthrough=True)
+
     @http.route('/api/dashboard/stock_picking/shipping_users', type='json', auth='user', methods=['POST'], csrf=False, cors='*')
+    @compact_response
     def get_shipping_users(self, **kwargs):
         """Danh sách user active để chọn người gửi xe."""
         try:
@@ -348,6 +393,7 @@ class StockPickingDashboardAPI(http.Controller):
             }
 
     @http.route('/api/dashboard/stock_picking/confirm_received', type='json', auth='user', methods=['POST'], csrf=False, cors='*')
+    @compact_response
     def confirm_shipping_received(self, **kwargs):
         """Chọn người gửi xe và chuyển trạng thái giao vận sang Đã nhận."""
         try:
@@ -393,6 +439,7 @@ class StockPickingDashboardAPI(http.Controller):
             }
     
     @http.route('/api/dashboard/stock_picking/filters', type='json', auth='user', methods=['POST'], csrf=False, cors='*')
+    @compact_response
     def get_filter_options(self, **kwargs):
         """API lấy các options cho filters"""
         try:
@@ -419,7 +466,80 @@ class StockPickingDashboardAPI(http.Controller):
                 'message': str(e)
             }
     
+    @http.route('/api/dashboard/stock_picking/facets', type='json', auth='user', methods=['POST'], csrf=False, cors='*')
+    @compact_response
+    def get_facets(self, **kwargs):
+        """API đếm số phiếu cho các tab: trạng thái quét, trạng thái phiếu, trạng thái giao vận
+
+        Nhận cùng filters / search / search_field như API list. Tất cả số đếm lấy từ một truy vấn GROUP BY:
+        số đếm của mỗi chiều áp dụng bộ lọc của các chiều còn lại (không áp dụng bộ lọc của chính nó).
+        """
+        try:
+            filters = kwargs.get('filters', {}) or {}
+            search_term = kwargs.get('search', '')
+            search_field = kwargs.get('search_field', 'all')
+
+            cache_key = (
+                request.env.cr.dbname,
+                # Số đếm phụ thuộc record rule của user
+                request.env.uid,
+                tuple(request.env.companies.ids),
+                request.env.lang,
+                json.dumps([filters, search_term, search_field], sort_keys=True, default=str),
+            )
+            data = FACET_CACHE.get(cache_key)
+            if data is None:
+                data = self._compute_facets(filters, search_term, search_field)
+                FACET_CACHE.set(cache_key, data)
+
+            return {
+                'status': 'success',
+                'data': data,
+            }
+        except Exception as e:
+            return {
+                'status': 'error',
+                'message': str(e)
+            }
+
+    def _compute_facets(self, filters, search_term, search_field):
+        Picking = request.env['stock.picking']
+        dimensions = [key for key, _fname in FACET_DIMENSIONS]
+        domain = self._build_picking_domain(filters, search_term, search_field, skip_filters=dimensions)
+        groups = Picking._read_group(domain, [fname for _key, fname in FACET_DIMENSIONS], ['__count'])
+
+        counts = {key: {} for key in dimensions}
+        total = 0
+        for *values, count in groups:
+            row = dict(zip(dimensions, values))
+            matches = {key: not filters.get(key) or row[key] == filters[key] for key in dimensions}
+            if all(matches.values()):
+                total += count
+            for key in dimensions:
+                if all(matched for other, matched in matches.items() if other != key):
+                    counts[key][row[key] or ''] = counts[key].get(row[key] or '', 0) + count
+
+        labels = {
+            'scan_type': self.SCAN_TYPE_LABELS_VI,
+            'state': self.STATE_LABELS_VI,
+            'ship_inf_state': dict(Picking._fields['ship_inf_state']._description_selection(request.env)),
+        }
+        facets = {}
+        for key in dimensions:
+            facets[key] = [
+                {'value': value, 'label': label, 'count': counts[key].pop(value, 0)}
+                for value, label in labels[key].items()
+            ]
+            # Giá trị ngoài danh sách nhãn (ví dụ chưa có trạng thái quét)
+            facets[key] += [
+                {'value': value or False, 'label': labels[key].get(value, value) or '', 'count': count}
+                for value, count in counts[key].items()
+            ]
+        facets['total'] = total
+        return facets
+
     @http.route('/api/dashboard/stock_picking/search_suggestions', type='json', auth='user', methods=['POST'], csrf=False, cors='*')
+    @compact_response
     def get_search_suggestions(self, **kwargs):
         """API lấy gợi ý search từ dữ liệu thực tế"""
         try:
@@ -433,83 +553,9 @@ class StockPickingDashboardAPI(http.Controller):
                     'data': []
                 }
             
-            Picking = request.env['stock.picking']
-            suggestions = []
-            
-            # Lấy suggestions theo field
-            if search_field == 'date':
-                # Lấy các ngày unique
-                pickings = Picking.search([
-                    ('picking_type_code', '=', 'outgoing'),
-                    ('scheduled_date', '!=', False)
-                ], limit=limit, order='scheduled_date desc')
-                seen = set()
-                for picking in pickings:
-                    if picking.scheduled_date:
-                        date_str = picking.scheduled_date.strftime('%Y-%m-%d')
-                        if date_str not in seen and search_term.lower() in date_str.lower():
-                            seen.add(date_str)
-                            suggestions.append({
-                                'value': date_str,
-                                'label': date_str
-                            })
-                            
-            elif search_field == 'sale_order':
-                # Lấy mã SO unique
-                pickings = Picking.search([
-                    ('picking_type_code', '=', 'outgoing'),
-                    ('sale_id.name', 'ilike', search_term)
-                ], limit=limit)
-                seen = set()
-                for picking in pickings:
-                    if picking.sale_id and picking.sale_id.name not in seen:
-                        seen.add(picking.sale_id.name)
-                        suggestions.append({
-                            'value': picking.sale_id.name,
-                            'label': picking.sale_id.name
-                        })
-                        
-            elif search_field == 'picking_name':
-                # Lấy mã phiếu unique
-                pickings = Picking.search([
-                    ('picking_type_code', '=', 'outgoing'),
-                    ('name', 'ilike', search_term)
-                ], limit=limit)
-                for picking in pickings:
-                    suggestions.append({
-                        'value': picking.name,
-                        'label': picking.name
-                    })
-                    
-            elif search_field == 'customer':
-                # Lấy khách hàng unique
-                pickings = Picking.search([
-                    ('picking_type_code', '=', 'outgoing'),
-                    ('partner_id.name', 'ilike', search_term)
-                ], limit=limit)
-                seen = set()
-                for picking in pickings:
-                    if picking.partner_id and picking.partner_id.name not in seen:
-                        seen.add(picking.partner_id.name)
-                        suggestions.append({
-                            'value': picking.partner_id.name,
-                            'label': picking.partner_id.name
-                        })
-                        
-            elif search_field == 'shipping_method':
-                # Lấy loại vận chuyển unique
-                pickings = Picking.search([
-                    ('picking_type_code', '=', 'outgoing'),
-                    ('shipping_method.name', 'ilike', search_term)
-                ], limit=limit)
-                seen = set()
-                for picking in pickings:
-                    if picking.shipping_method and picking.shipping_method.name not in seen:
-                        seen.add(picking.shipping_method.name)
-                        suggestions.append({
-                            'value': picking.shipping_method.name,
-                            'label': picking.shipping_method.name
-                        })
+            # Truy vấn giá trị phân biệt trực tiếp qua index, cache ngắn hạn theo (field, từ khóa)
+            suggestions = request.env['stock.picking.dashboard.suggestion.service'].get_suggestions(
+                search_field, search_term, limit)
             
             return {
                 'status': 'success',
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+import csv
+import io
+import tempfile
+
+import xlsxwriter
+
+from odoo import api
+from odoo.tools import SQL
+
+# Số phiếu đọc từ server-side cursor cho mỗi lô
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_CURSOR_NAME = 'qr_dashboard_export'
+# Kích thước mỗi khối byte khi trả file XLSX
+EXPORT_STREAM_BLOCK = 64 * 1024
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Cột của file export: (tên field của dòng dashboard, tiêu đề cột)
+LIST_EXPORT_COLUMNS = (
+    ('name', 'Mã phiếu'),
+    ('date', 'Ngày dự kiến'),
+    ('sale_order', 'Đơn bán'),
+    ('customer', 'Khách hàng'),
+    ('salesperson', 'NV kinh doanh'),
+    ('shipping_method', 'Phương thức vận chuyển'),
+    ('scan_type_label', 'Trạng thái quét'),
+    ('state_label', 'Trạng thái'),
+    ('origin', 'Chứng từ gốc'),
+    ('note', 'Ghi chú giao hàng'),
+    ('assigned_task_date', 'Thời gian giao việc'),
+)
+DELIVERY_EXPORT_COLUMNS = (
+    ('name', 'Mã phiếu'),
+    ('date', 'Ngày dự kiến'),
+    ('sale_order', 'Đơn bán'),
+    ('customer', 'Khách hàng'),
+    ('salesperson', 'NV kinh doanh'),
+    ('shipping_method', 'Phương thức vận chuyển'),
+    ('state_label', 'Trạng thái'),
+    ('assigned_task_date', 'Thời gian giao việc'),
+    ('recipient_name', 'Người nhận'),
+    ('recipient_phone', 'SĐT người nhận'),
+    ('recipient_address', 'Địa chỉ người nhận'),
+    ('park_info', 'Thông tin gửi xe'),
+    ('ship_inf_state', 'Trạng thái gửi xe'),
+    ('shipping_confirmed_by_name', 'Người xác nhận gửi xe'),
+)
+
+
+def iter_export_chunks(registry, uid, context, id_query, row_fields, columns, labels=None):
+    """Sinh từng lô giá trị (list các list theo ``columns``) của các phiếu trong ``id_query``.
+
+    Chạy sau khi request đã trả về nên dùng cursor riêng; id được đọc dần qua
+    server-side cursor (DECLARE/FETCH) nên bộ nhớ không phụ thuộc số dòng.
+    """
+    with registry.cursor() as cr:
+        env = api.Environment(cr, uid, context)
+        serializer = env['stock.picking.dashboard.row.serializer']
+        cursor_name = SQL.identifier(EXPORT_CURSOR_NAME)
+        cr.execute(SQL('DECLARE %s NO SCROLL CURSOR FOR %s', cursor_name, id_query))
+        while True:
+            cr.execute(SQL('FETCH FORWARD %s FROM %s', EXPORT_CHUNK_SIZE, cursor_name))
+            ids = [row[0] for row in cr.fetchall()]
+            if not ids:
+                break
+            rows = serializer.serialize(
+                ids, row_fields, labels=labels, field_names=[key for key, _title in columns],
+            )
+            yield [[_export_value(row[key]) for key, _title in columns] for row in rows]
+            env.invalidate_all()
+        cr.execute(SQL('CLOSE %s', cursor_name))
+
+
+def _export_value(value):
+    return '' if value is False or value is None else value
+
+
+def stream_csv(chunks, columns):
+    """CSV UTF-8 (có BOM để Excel nhận đúng tiếng Việt), trả về từng lô"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow([title for _key, title in columns])
+    for chunk in chunks:
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def stream_xlsx(chunks, columns, sheet_name):
+    """XLSX ghi ở chế độ constant_memory (mỗi dòng được đẩy ra file tạm ngay khi ghi xong).
+
+    File zip chỉ hoàn chỉnh khi đóng workbook nên được dựng trên file tạm rồi trả về theo khối.
+    """
+    with tempfile.TemporaryFile() as output:
+        workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+        sheet = workbook.add_worksheet(sheet_name)
+        sheet.write_row(0, 0, [title for _key, title in columns], workbook.add_format({'bold': True}))
+        row_index = 1
+        for chunk in chunks:
+            for values in chunk:
+                sheet.write_row(row_index, 0, values)
+                row_index += 1
+        workbook.close()
+
+        output.seek(0)
+        while True:
+            block = output.read(EXPORT_STREAM_BLOCK)
+            if not block:
+                break
+            yield block
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+from werkzeug.security import safe_join
+
+from odoo.http import request, Response
+from odoo.modules import get_resource_path
+
+from .cache_utils import LRUCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# URL của file trong static/dashboard mà bản build React tham chiếu trong index.html
+DASHBOARD_STATIC_URL_RE = re.compile(r'/qr_scan_odoo_18/static/dashboard/([\w\-./]+)')
+# Route phục vụ file theo URL có hash nội dung: /dashboard/stock_picking/static/<hash>/<path>
+DASHBOARD_ASSET_ROUTE = '/dashboard/stock_picking/static'
+
+# File có hash trong URL không bao giờ đổi nội dung -> cache lâu dài;
+# shell HTML luôn kiểm tra lại bằng ETag để nhận bản build mới ngay
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+COMPRESSIBLE_MIMETYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+MIN_COMPRESS_SIZE = 1024
+
+# Nội dung file (kèm bản nén gzip/brotli) trong bộ nhớ worker, khóa theo (path, mtime, size, transform)
+# nên tự nạp lại khi file được build lại
+STATIC_FILE_CACHE = LRUCache(maxsize=64)
+
+
+def dashboard_static_dir():
+    return get_resource_path('qr_scan_odoo_18', 'static', 'dashboard')
+
+
+def load_static_file(path, transform=None):
+    """Nội dung đã xử lý của file: dict {body, hash, mimetype, variants {encoding: bytes}}.
+
+    Chỉ đọc và nén lại khi mtime/kích thước file thay đổi. Bản đã biến đổi (shell HTML)
+    và bản gốc của cùng một file là hai entry riêng.
+    """
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size, transform.__name__ if transform else None)
+    return STATIC_FILE_CACHE.get_or_set(key, lambda: _build_static_entry(path, transform))
+
+
+def _build_static_entry(path, transform=None):
+    with open(path, 'rb') as f:
+        body = f.read()
+    if transform:
+        body = transform(body)
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    variants = {}
+    if len(body) >= MIN_COMPRESS_SIZE and mimetype.startswith(COMPRESSIBLE_MIMETYPES):
+        variants['gzip'] = gzip.compress(body, compresslevel=9)
+        if brotli is not None:
+            variants['br'] = brotli.compress(body)
+    return {
+        'body': body,
+        'hash': hashlib.sha256(body).hexdigest()[:16],
+        'mimetype': mimetype,
+        # Chỉ giữ bản nén thực sự nhỏ hơn
+        'variants': {encoding: data for encoding, data in variants.items() if len(data) < len(body)},
+    }
+
+
+def load_dashboard_shell(path):
+    """index.html với URL file tĩnh được đổi sang URL có hash nội dung"""
+    return load_static_file(path, transform=_rewrite_static_urls)
+
+
+def _rewrite_static_urls(html):
+    static_dir = dashboard_static_dir()
+
+    def replace(match):
+        asset_path = safe_join(static_dir, match.group(1))
+        if not asset_path or not os.path.isfile(asset_path):
+            return match.group(0)
+        entry = load_static_file(asset_path)
+        return '%s/%s/%s' % (DASHBOARD_ASSET_ROUTE, entry['hash'], match.group(1))
+
+    return DASHBOARD_STATIC_URL_RE.sub(replace, html.decode('utf-8')).encode('utf-8')
+
+
+def static_file_response(entry, cache_control):
+    """Response cho file đã cache: chọn bản br/gzip theo Accept-Encoding, trả 304 khi ETag khớp"""
+    httprequest = request.httprequest
+    encoding = None
+    for candidate in ('br', 'gzip'):
+        if candidate in entry['variants'] and candidate in httprequest.accept_encodings:
+            encoding = candidate
+            break
+
+    # ETag khác nhau cho từng bản nén của cùng nội dung
+    etag = '%s-%s' % (entry['hash'], encoding) if encoding else entry['hash']
+    headers = [
+        ('Content-Type', entry['mimetype'] + ('; charset=utf-8' if entry['mimetype'].startswith('text/') else '')),
+        ('Cache-Control', cache_control),
+        ('ETag', '"%s"' % etag),
+        ('Vary', 'Accept-Encoding'),
+    ]
+    if httprequest.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
+    if encoding:
+        headers.append(('Content-Encoding', encoding))
+    return Response(entry['variants'][encoding] if encoding else entry['body'], headers=headers)
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 # from . import models
+from . import cache_generation
 from . import stock_location
 from . import stock_picking_qr
 from . import stock_quant
@@ -10,4 +11,10 @@ from . import sale_order_confirm_inherit
 from . import product_template
 from . import customer_shipping_history
 from . import qr_scan_notification
+from . import qr_scan_device_token
+from . import ir_http
+from . import ir_websocket
+from . import hr_employee
+from . import res_users
+from . import delivery_carrier
 # from . import stock_location_inventory_processor
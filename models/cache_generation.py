@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from odoo import models, api
+
+_logger = logging.getLogger(__name__)
+
+# Bảng bộ đếm thế hệ cho các cache trong bộ nhớ worker: mỗi dòng (tên cache, thế hệ)
+CACHE_GENERATION_TABLE = 'qr_scan_cache_generation'
+
+
+class QRScanCacheGeneration(models.AbstractModel):
+    _name = 'qr_scan.cache.generation'
+    _description = 'QR Scan Cache Generation'
+
+    def init(self):
+        super().init()
+        self._cr.execute("""
+            CREATE TABLE IF NOT EXISTS %s (
+                name varchar PRIMARY KEY,
+                value bigint NOT NULL DEFAULT 0
+            )
+        """ % CACHE_GENERATION_TABLE)
+
+    @api.model
+    def _get_generation(self, name):
+        """Thế hệ hiện tại của cache ``name``, dùng làm một phần khóa cache.
+
+        Đọc trong snapshot của transaction hiện tại (khác với sequence): thế hệ chỉ tăng
+        sau khi dữ liệu đã commit, nên request nào thấy thế hệ mới cũng thấy dữ liệu mới.
+        """
+        self.env.cr.execute("SELECT value FROM %s WHERE name = %%s" % CACHE_GENERATION_TABLE, [name])
+        row = self.env.cr.fetchone()
+        return row[0] if row else 0
+
+    @api.model
+    def _get_or_build(self, name, cache, key, factory, cacheable=None):
+        """Giá trị ``factory()`` lưu trong ``cache`` (LRUCache của worker) theo (db, thế hệ ``name``, *key).
+
+        Khi chính transaction này đã sửa dữ liệu của cache (thế hệ sẽ tăng sau commit),
+        giá trị được tính thẳng và không lưu: nó có thể chứa thay đổi chưa commit hoặc bị rollback.
+        """
+        if name in self.env.cr.postcommit.data.get('qr_scan.cache_generation', ()):
+            return factory()
+        full_key = (self.env.cr.dbname, self._get_generation(name)) + tuple(key)
+        return cache.get_or_set(full_key, factory, cacheable)
+
+    @api.model
+    def _bump_generation(self, name):
+        """Tăng thế hệ của cache ``name`` sau khi transaction hiện tại commit.
+
+        Mỗi cache chỉ tăng một lần cho mỗi transaction; các cache cùng transaction
+        được tăng chung trong một cursor riêng, chạy ở READ COMMITTED để các lần tăng
+        đồng thời chờ nhau thay vì lỗi serialize. Lỗi chỉ được ghi log: ghi dữ liệu đã
+        commit, không được làm hỏng response hay bỏ qua các hook postcommit khác.
+        """
+        pending = self.env.cr.postcommit.data.setdefault('qr_scan.cache_generation', set())
+        if name in pending:
+            return
+        if not pending:
+            registry = self.env.registry
+
+            @self.env.cr.postcommit.add
+            def bump_generations():
+                try:
+                    with registry.cursor() as cr:
+                        cr.execute("SET TRANSACTION ISOLATION LEVEL READ COMMITTED")
+                        cr.execute("""
+                            INSERT INTO {table} (name, value)
+                            SELECT unnest(%s::varchar[]), 1
+                            ON CONFLICT (name) DO UPDATE SET value = {table}.value + 1
+                        """.format(table=CACHE_GENERATION_TABLE), [sorted(pending)])
+                except Exception:
+                    _logger.exception("Could not bump cache generations %s", sorted(pending))
+        pending.add(name)
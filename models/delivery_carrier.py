@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+
+# Từ khóa tên phương thức vận chuyển cần theo dõi gửi xe (giá trị mặc định của cờ)
+TRACKED_SHIPPING_KEYWORDS = ('xe tải', 'xe bus', 'grab')
+
+
+class DeliveryCarrier(models.Model):
+    _inherit = 'delivery.carrier'
+
+    is_tracked_shipping = fields.Boolean(
+        string='Theo dõi gửi xe',
+        compute='_compute_is_tracked_shipping',
+        store=True,
+        readonly=False,
+        help='Phiếu xuất dùng phương thức này phải quét gửi xe / nhận hàng (Xe tải, Xe bus, Grab...). '
+             'Mặc định theo tên phương thức, có thể sửa tay.',
+    )
+
+    @api.depends('name')
+    def _compute_is_tracked_shipping(self):
+        for carrier in self:
+            name = (carrier.name or '').lower()
+            carrier.is_tracked_shipping = any(keyword in name for keyword in TRACKED_SHIPPING_KEYWORDS)
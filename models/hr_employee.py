@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+
+from odoo import models, api
+
+from ..controllers.cache_utils import LRUCache
+
+# Các field ảnh hưởng tới danh bạ nhân viên của App QR
+QR_DIRECTORY_FIELDS = {'name', 'active', 'user_id', 'department_id'}
+# Danh bạ đã dựng trong bộ nhớ worker, khóa theo (db, thế hệ danh bạ)
+QR_DIRECTORY_CACHE = LRUCache(maxsize=16)
+# Tên bộ đếm thế hệ (qr_scan.cache.generation) của danh bạ
+QR_DIRECTORY_GENERATION = 'hr_employee_qr_directory'
+
+
+class HrEmployee(models.Model):
+    _inherit = 'hr.employee'
+
+    @api.model
+    def _get_qr_employee_directory(self):
+        """Danh bạ nhân viên active dùng cho App QR (chọn người nhận chuyển giao).
+
+        Được cache theo worker, khóa theo thế hệ danh bạ (tăng khi nhân viên/phòng ban thay đổi).
+        Trả về dict gồm:
+            version: hash nội dung, App gửi lại để bỏ qua tải danh sách khi không đổi
+            employees: tuple các dict {id, name, user_id, department_id, department}
+            by_id / by_user: tra cứu nhanh theo id nhân viên / id user
+        Kết quả dùng chung giữa các request, không được sửa trực tiếp.
+        """
+        return self.env['qr_scan.cache.generation']._get_or_build(
+            QR_DIRECTORY_GENERATION, QR_DIRECTORY_CACHE, (), self._build_qr_employee_directory,
+        )
+
+    @api.model
+    def _build_qr_employee_directory(self):
+        records = self.sudo().search([('active', '=', True)], order='name')
+        employees = tuple(
+            {
+                'id': employee.id,
+                'name': employee.name,
+                'user_id': employee.user_id.id or None,
+                'department_id': employee.department_id.id or None,
+                'department': employee.department_id.name or '',
+            }
+            for employee in records
+        )
+        by_user = {}
+        for employee in employees:
+            if employee['user_id']:
+                by_user.setdefault(employee['user_id'], employee)
+        version = hashlib.sha1(json.dumps(employees, sort_keys=True).encode()).hexdigest()[:16]
+        return {
+            'version': version,
+            'employees': employees,
+            'by_id': {employee['id']: employee for employee in employees},
+            'by_user': by_user,
+        }
+
+    @api.model
+    def _invalidate_qr_employee_directory(self):
+        self.env['qr_scan.cache.generation']._bump_generation(QR_DIRECTORY_GENERATION)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        employees = super().create(vals_list)
+        self._invalidate_qr_employee_directory()
+        return employees
+
+    def write(self, vals):
+        res = super().write(vals)
+        if QR_DIRECTORY_FIELDS.intersection(vals):
+            self._invalidate_qr_employee_directory()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self._invalidate_qr_employee_directory()
+        return res
+
+
+class HrDepartment(models.Model):
+    _inherit = 'hr.department'
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'name' in vals:
+            self.env['hr.employee']._invalidate_qr_employee_directory()
+        return res
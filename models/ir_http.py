@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import gzip
+import logging
+import zlib
+
+from odoo import models
+from odoo.http import request
+from odoo.tools import json_default
+
+_logger = logging.getLogger(__name__)
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+# Payload nhỏ hơn ngưỡng này nén không có lợi
+COMPRESS_MIN_SIZE = 1024
+
+
+class IrHttp(models.AbstractModel):
+    _inherit = 'ir.http'
+
+    @classmethod
+    def _post_dispatch(cls, response):
+        super()._post_dispatch(response)
+        if request.httprequest.path.startswith('/api/'):
+            try:
+                cls._qr_encode_api_response(response)
+            except Exception:
+                _logger.exception("Could not encode API response for %s", request.httprequest.path)
+
+    @classmethod
+    def _qr_encode_api_response(cls, response):
+        """Thương lượng định dạng response cho /api/* theo header Accept / Accept-Encoding.
+
+        - Accept: application/msgpack -> body MessagePack mã hóa thẳng từ kết quả Python của route
+          (cần thư viện msgpack, không có thì giữ JSON).
+        - Accept-Encoding: gzip/deflate -> nén body nếu đủ lớn.
+        - Lỗi RATE_LIMITED -> thêm header Retry-After.
+        """
+        if response.status_code != 200 or response.direct_passthrough or response.headers.get('Content-Encoding'):
+            return
+
+        httprequest = request.httprequest
+        vary = ['Accept-Encoding']
+
+        result = getattr(request, 'qr_api_result', None)
+        if isinstance(result, dict) and result.get('error_code') == 'RATE_LIMITED':
+            response.headers['Retry-After'] = str(result.get('retry_after') or 1)
+        if (msgpack and result is not None and response.mimetype == 'application/json'
+                and httprequest.accept_mimetypes.best_match(('application/json',) + MSGPACK_MIMETYPES) in MSGPACK_MIMETYPES):
+            envelope = {
+                'jsonrpc': '2.0',
+                'id': getattr(request.dispatcher, 'request_id', None),
+                'result': result,
+            }
+            response.set_data(msgpack.packb(envelope, default=json_default, use_bin_type=True))
+            response.mimetype = 'application/msgpack'
+            vary.append('Accept')
+
+        data = response.get_data()
+        encoding = httprequest.accept_encodings.best_match(('gzip', 'deflate'))
+        if encoding and len(data) >= COMPRESS_MIN_SIZE:
+            if encoding == 'gzip':
+                data = gzip.compress(data, compresslevel=6)
+            else:
+                data = zlib.compress(data, 6)
+            response.set_data(data)
+            response.headers['Content-Encoding'] = encoding
+        for header in vary:
+            response.vary.add(header)
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+from odoo import models
+
+from .stock_picking_qr import DASHBOARD_BUS_CHANNEL, DASHBOARD_BUS_GROUP
+
+
+class IrWebsocket(models.AbstractModel):
+    _inherit = 'ir.websocket'
+
+    def _build_bus_channel_list(self, channels):
+        # Kênh dashboard là chuỗi cố định, ai cũng có thể xin đăng ký:
+        # chỉ cho người dùng kho nội bộ nhận thay đổi phiếu (không cho portal / public)
+        if DASHBOARD_BUS_CHANNEL in channels and not self.env.user.has_group(DASHBOARD_BUS_GROUP):
+            channels = [channel for channel in channels if channel != DASHBOARD_BUS_CHANNEL]
+        return super()._build_bus_channel_list(channels)
@@ -1,5 +1,21 @@
+import hashlib
+import json
+
 from odoo import models, fields, api
 
+from ..controllers.cache_utils import LRUCache
+
+# Sản phẩm chi phí mặc định cho màn hình chi phí gửi xe của App QR
+DEFAULT_SHIPPING_EXPENSE_NAME = 'Chi phí vận chuyển đơn hàng'
+# Các field ảnh hưởng tới danh mục chi phí của App QR
+QR_EXPENSE_CATALOG_FIELDS = {
+    'name', 'active', 'can_be_expensed', 'company_id', 'property_account_expense_id', 'product_tmpl_id',
+}
+# Danh mục đã dựng trong bộ nhớ worker, khóa theo (db, thế hệ danh mục, công ty, ngôn ngữ)
+QR_EXPENSE_CATALOG_CACHE = LRUCache(maxsize=32)
+# Tên bộ đếm thế hệ (qr_scan.cache.generation) của danh mục chi phí
+QR_EXPENSE_CATALOG_GENERATION = 'product_qr_expense_catalog'
+
 
 class ProductTemplate(models.Model):
     _inherit = 'product.template'
@@ -19,6 +35,26 @@ class ProductTemplate(models.Model):
                 tmpl.product_variant_ids.mapped('free_qty')
             )
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        templates = super().create(vals_list)
+        if any(vals.get('can_be_expensed') for vals in vals_list):
+            self.env['product.product']._invalidate_qr_expense_catalog()
+        return templates
+
+    def write(self, vals):
+        res = super().write(vals)
+        if QR_EXPENSE_CATALOG_FIELDS.intersection(vals):
+            self.env['product.product']._invalidate_qr_expense_catalog()
+        return res
+
+    def unlink(self):
+        expensable = any(self.mapped('can_be_expensed'))
+        res = super().unlink()
+        if expensable:
+            self.env['product.product']._invalidate_qr_expense_catalog()
+        return res
+
 
 class ProductProduct(models.Model):
     _inherit = 'product.product'
@@ -29,3 +65,71 @@ class ProductProduct(models.Model):
         tracking=True,
         help="Ngày gần nhất sản phẩm được tăng tồn do nhập kho hoặc khách trả hàng."
     )
+
+    @api.model
+    def _get_qr_expense_catalog(self, company_id):
+        """Danh mục sản phẩm chi phí cho App QR, cache theo công ty và ngôn ngữ trong bộ nhớ worker.
+
+        Tài khoản chi phí (property theo công ty) được đọc một lần khi dựng cache.
+        Thế hệ danh mục tăng khi sản phẩm chi phí hoặc tài khoản chi phí của sản phẩm thay đổi.
+        Kết quả dùng chung giữa các request, không được sửa trực tiếp.
+        """
+        return self.env['qr_scan.cache.generation']._get_or_build(
+            # Tên sản phẩm được dịch, sản phẩm mặc định cũng được xác định theo tên
+            QR_EXPENSE_CATALOG_GENERATION, QR_EXPENSE_CATALOG_CACHE, (company_id, self.env.lang),
+            lambda: self._build_qr_expense_catalog(company_id),
+        )
+
+    @api.model
+    def _build_qr_expense_catalog(self, company_id):
+        products = self.sudo().with_company(company_id).search([
+            ('can_be_expensed', '=', True)
+        ], limit=50)
+        # Ưu tiên "Chi phí vận chuyển đơn hàng" lên đầu tiên
+        products = sorted(products, key=lambda p: 0 if p.name == DEFAULT_SHIPPING_EXPENSE_NAME else 1)
+
+        items = tuple(
+            {
+                'id': p.id,
+                'name': p.name,
+                'account_id': p.property_account_expense_id.id or None,
+                'account_name': p.property_account_expense_id.name or '',
+            }
+            for p in products
+        )
+        default_item = next((item for item in items if item['name'] == DEFAULT_SHIPPING_EXPENSE_NAME), None)
+        # Màn hình chi phí chọn sẵn sản phẩm đầu tiên nếu không có sản phẩm mặc định
+        default_product_id = default_item['id'] if default_item else (items[0]['id'] if items else None)
+        version = hashlib.sha1(json.dumps(items, sort_keys=True).encode()).hexdigest()[:16]
+        return {
+            'version': version,
+            'products': items,
+            'by_id': {item['id']: item for item in items},
+            'default_product_id': default_product_id,
+            # Chỉ sản phẩm "Chi phí vận chuyển đơn hàng" (None nếu không có), dùng khi lưu không chọn danh mục
+            'shipping_product_id': default_item['id'] if default_item else None,
+        }
+
+    @api.model
+    def _invalidate_qr_expense_catalog(self):
+        self.env['qr_scan.cache.generation']._bump_generation(QR_EXPENSE_CATALOG_GENERATION)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        products = super().create(vals_list)
+        if products.filtered('can_be_expensed'):
+            self.env['product.product']._invalidate_qr_expense_catalog()
+        return products
+
+    def write(self, vals):
+        res = super().write(vals)
+        if QR_EXPENSE_CATALOG_FIELDS.intersection(vals):
+            self.env['product.product']._invalidate_qr_expense_catalog()
+        return res
+
+    def unlink(self):
+        expensable = any(self.mapped('can_be_expensed'))
+        res = super().unlink()
+        if expensable:
+            self.env['product.product']._invalidate_qr_expense_catalog()
+        return res
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import hmac
+import secrets
+from datetime import timedelta
+
+from odoo import models, fields, api
+
+from ..controllers.cache_utils import LRUCache
+
+# Số ngày hiệu lực mặc định của token thiết bị, cấu hình qua System Parameters
+TOKEN_VALIDITY_PARAM = 'qr_scan_odoo_18.device_token_days'
+DEFAULT_TOKEN_VALIDITY_DAYS = 90
+
+# Kết quả tra token trong bộ nhớ worker, khóa theo (db, thế hệ cache token, hash token)
+TOKEN_ENTRY_CACHE = LRUCache(maxsize=4096)
+# Tên bộ đếm thế hệ (qr_scan.cache.generation), tăng khi token bị thu hồi/sửa/xóa hoặc user bị khóa
+TOKEN_CACHE_GENERATION = 'qr_scan_device_token'
+# Sửa các field này thì kết quả tra token đã cache không còn đúng
+TOKEN_CACHE_FIELDS = {'active', 'user_id', 'token_hash', 'expiration_date'}
+
+
+class QRScanDeviceToken(models.Model):
+    _name = 'qr_scan.device.token'
+    _description = 'QR Scan App Device Token'
+    _order = 'create_date desc'
+
+    name = fields.Char(string='Thiết bị')
+    device_id = fields.Char(string='Mã thiết bị', index=True)
+    user_id = fields.Many2one('res.users', string='Người dùng', required=True, index=True, ondelete='cascade')
+    # Chỉ lưu hash SHA-256 của token, không lưu token gốc
+    token_hash = fields.Char(string='Token Hash', required=True, index=True, copy=False)
+    expiration_date = fields.Datetime(string='Hết hạn')
+    active = fields.Boolean(string='Còn hiệu lực', default=True)
+
+    _sql_constraints = [
+        ('token_hash_unique', 'unique(token_hash)', 'Token thiết bị bị trùng!'),
+    ]
+
+    @api.model
+    def _get_token_secret(self):
+        return self.env['ir.config_parameter'].sudo().get_param('database.secret')
+
+    @api.model
+    def _sign(self, nonce):
+        secret = self._get_token_secret()
+        return hmac.new(secret.encode(), nonce.encode(), hashlib.sha256).hexdigest()
+
+    @api.model
+    def _hash_token(self, token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @api.model
+    def _issue_token(self, user, device_id, device_name=None):
+        """Cấp token mới cho thiết bị, thu hồi các token cũ của cùng thiết bị. Trả về token gốc."""
+        self.search([('user_id', '=', user.id), ('device_id', '=', device_id)]).write({'active': False})
+
+        nonce = secrets.token_urlsafe(32)
+        token = '%s.%s' % (nonce, self._sign(nonce))
+        days = int(self.env['ir.config_parameter'].sudo().get_param(
+            TOKEN_VALIDITY_PARAM, DEFAULT_TOKEN_VALIDITY_DAYS))
+        self.create({
+            'name': device_name or device_id,
+            'device_id': device_id,
+            'user_id': user.id,
+            'token_hash': self._hash_token(token),
+            'expiration_date': fields.Datetime.now() + timedelta(days=days) if days else False,
+        })
+        return token
+
+    @api.model
+    def _verify_signature(self, token):
+        """Token có đúng chữ ký HMAC do server cấp hay không (không tra bảng token)"""
+        if not token or '.' not in token:
+            return False
+        nonce, signature = token.rsplit('.', 1)
+        return hmac.compare_digest(signature, self._sign(nonce))
+
+    @api.model
+    def _check_token(self, token):
+        """Trả về uid nếu token hợp lệ, ngược lại False.
+
+        Chữ ký HMAC được kiểm tra trước (không cần DB), sau đó tra hash qua cache của worker.
+        """
+        if not self._verify_signature(token):
+            return False
+        entry = self._get_token_entry(self._hash_token(token))
+        if not entry:
+            return False
+        uid, expiration = entry
+        if expiration and expiration < fields.Datetime.now():
+            return False
+        return uid
+
+    @api.model
+    def _get_token_entry(self, token_hash):
+        """(uid, hạn dùng) của token còn hiệu lực, None nếu không có.
+
+        Chỉ cache kết quả tìm thấy, nên token mới cấp không cần xóa cache; thu hồi token
+        hoặc khóa user tăng thế hệ cache token (chỉ ảnh hưởng cache này) cho mọi worker.
+        """
+        generation = self.env['qr_scan.cache.generation']._get_generation(TOKEN_CACHE_GENERATION)
+        key = (self.env.cr.dbname, generation, token_hash)
+        entry = TOKEN_ENTRY_CACHE.get(key)
+        if entry is None:
+            record = self.sudo().search([('token_hash', '=', token_hash)], limit=1)
+            if not record or not record.user_id.active:
+                return None
+            entry = (record.user_id.id, record.expiration_date)
+            TOKEN_ENTRY_CACHE.set(key, entry)
+        return entry
+
+    @api.model
+    def _invalidate_token_cache(self):
+        self.env['qr_scan.cache.generation']._bump_generation(TOKEN_CACHE_GENERATION)
+
+    @api.model
+    def _revoke_token(self, token):
+        self.search([('token_hash', '=', self._hash_token(token))]).write({'active': False})
+
+    def action_revoke(self):
+        self.write({'active': False})
+        return True
+
+    def write(self, vals):
+        res = super().write(vals)
+        if TOKEN_CACHE_FIELDS.intersection(vals):
+            self._invalidate_token_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self._invalidate_token_cache()
+        return res
@@ -1,7 +1,11 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api
+from odoo.tools.sql import create_index
 from markupsafe import Markup
 
+# Kênh bus (type) App QR lắng nghe để nhận thông báo đẩy thay cho polling
+QR_NOTIFICATION_BUS_TYPE = 'qr_scan.notification'
+
 class QRScanNotification(models.Model):
     _name = 'qr_scan.notification'
     _description = 'QR Scan App Notifications'
@@ -34,6 +38,12 @@ class QRScanNotification(models.Model):
     
     # Cho reassignment request
     picking_id = fields.Many2one('stock.picking', string='Related Picking')
+    # Chuyển giao hàng loạt: một thông báo gộp cho nhiều phiếu
+    picking_ids = fields.Many2many(
+        'stock.picking', 'qr_scan_notification_picking_rel', 'notification_id', 'picking_id',
+        string='Related Pickings')
+    # Chatter của các phiếu được ghi bất đồng bộ bởi cron
+    chatter_pending = fields.Boolean(string='Chatter Pending', default=False, index=True, copy=False)
     from_user_id = fields.Many2one('res.users', string='From User')
     new_employee_id = fields.Many2one('hr.employee', string='New Employee')
     
@@ -41,6 +51,143 @@ class QRScanNotification(models.Model):
     create_date = fields.Datetime(string='Created At', readonly=True)
     response_date = fields.Datetime(string='Response Date')
     
+    def init(self):
+        super().init()
+        # Hộp thư App QR: chỉ index thông báo chưa đọc, phân trang theo id giảm dần
+        create_index(
+            self._cr,
+            'qr_scan_notification_unread_recipient_idx',
+            self._table,
+            ['recipient_user_id', 'id DESC'],
+            where='is_read IS NOT TRUE',
+        )
+
+    @api.model
+    def _qr_search_inbox(self, user_id, limit, before_id=None, unread_only=False):
+        """Trang thông báo của user, mới nhất trước, phân trang theo id (cursor).
+
+        Picking và người gửi của cả trang được nạp trước trong một lần truy vấn.
+        """
+        domain = [('recipient_user_id', '=', int(user_id))]
+        if before_id:
+            domain.append(('id', '<', int(before_id)))
+        if unread_only:
+            domain.append(('is_read', '!=', True))
+        notifications = self.search(domain, order='id desc', limit=limit)
+        notifications.picking_id.fetch(['name', 'origin'])
+        notifications.picking_ids.fetch(['name', 'origin'])
+        notifications.from_user_id.fetch(['name'])
+        return notifications
+
+    def _qr_to_dict(self):
+        """Dữ liệu thông báo gửi cho App (API danh sách và tin nhắn bus)"""
+        self.ensure_one()
+        data = {
+            'id': self.id,
+            'notification_type': self.notification_type,
+            'title': self.title,
+            'message': self.message,
+            'is_read': self.is_read,
+            'is_processed': self.is_processed,
+            'response': self.response,
+            'create_date': self.create_date.isoformat() if self.create_date else None,
+            'response_date': self.response_date.isoformat() if self.response_date else None,
+        }
+        # Thêm thông tin picking nếu có
+        if self.picking_id:
+            data['picking_id'] = self.picking_id.id
+            data['picking_name'] = self.picking_id.name
+            data['order_name'] = self.picking_id.origin or self.picking_id.name
+        if self.picking_ids:
+            data['picking_ids'] = self.picking_ids.ids
+            data['picking_names'] = self.picking_ids.mapped('name')
+        # Thêm thông tin người gửi
+        if self.from_user_id:
+            data['from_user_name'] = self.from_user_id.name
+        return data
+
+    def _qr_notify_bus(self, event):
+        """Đẩy thông báo lên bus tới partner của người nhận (và người gửi khi có phản hồi).
+
+        App đăng nhập bằng session nhận qua websocket của Odoo; App dùng token thiết bị
+        lấy các tin nhắn này qua /api/notifications/poll.
+        """
+        bus = self.env['bus.bus'].sudo()
+        for notification in self:
+            payload = dict(notification._qr_to_dict(), event=event)
+            users = notification.recipient_user_id
+            if event == 'responded':
+                users |= notification.from_user_id
+            for user in users:
+                bus._sendone(user.partner_id, QR_NOTIFICATION_BUS_TYPE, payload)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        notifications = super().create(vals_list)
+        notifications.recipient_user_id._qr_refresh_unread_count()
+        notifications._qr_notify_bus('created')
+        return notifications
+
+    def write(self, vals):
+        affects_count = 'is_read' in vals or 'recipient_user_id' in vals
+        users = self.recipient_user_id if affects_count else None
+        res = super().write(vals)
+        if affects_count:
+            (users | self.recipient_user_id)._qr_refresh_unread_count()
+        return res
+
+    def unlink(self):
+        users = self.recipient_user_id
+        res = super().unlink()
+        users._qr_refresh_unread_count()
+        return res
+
+    @api.model
+    def _qr_create_bulk_reassign_request(self, pickings, new_employee, from_user_id, requester_name):
+        """Tạo một thông báo gộp yêu cầu nhận nhiều phiếu, chatter được ghi sau bởi cron"""
+        names = ', '.join(pickings.mapped('name'))
+        notification = self.create([{
+            'notification_type': 'reassign_request',
+            'title': 'Yêu cầu nhận công việc giao hàng',
+            'message': f'{requester_name} yêu cầu bạn thay thế giao hàng cho {len(pickings)} phiếu: {names}',
+            'recipient_user_id': new_employee.user_id.id,
+            'picking_ids': [fields.Command.set(pickings.ids)],
+            'from_user_id': from_user_id,
+            'new_employee_id': new_employee.id,
+            'related_model': 'stock.picking',
+            'is_read': False,
+            'response': 'pending',
+            'chatter_pending': True,
+        }])
+        self.env.ref('qr_scan_odoo_18.cron_post_reassign_chatter')._trigger()
+        return notification
+
+    @api.model
+    def _cron_post_reassign_chatter(self, batch_size=100):
+        """Ghi chatter cho các phiếu của yêu cầu chuyển giao hàng loạt (mỗi phiếu một tin nhắn)"""
+        notifications = self.search([('chatter_pending', '=', True)], order='id', limit=batch_size)
+        for notification in notifications:
+            requester_name = notification.from_user_id.name or ''
+            employee_name = notification.new_employee_id.name or ''
+            pickings = notification.picking_ids
+            for picking in pickings:
+                picking.message_post(
+                    body=Markup(f"""
+                        <p><strong>🔄 Yêu cầu chuyển giao công việc (hàng loạt: {len(pickings)} phiếu)</strong></p>
+                        <ul>
+                            <li><strong>Từ:</strong> {requester_name}</li>
+                            <li><strong>Đến:</strong> {employee_name}</li>
+                            <li><strong>Thời gian:</strong> {notification.create_date}</li>
+                        </ul>
+                        <p><em>Đang chờ {employee_name} xác nhận...</em></p>
+                    """),
+                    subject=f'Yêu cầu chuyển giao: {picking.name}',
+                    message_type='notification',
+                )
+            notification.chatter_pending = False
+        if len(notifications) == batch_size:
+            self.env.ref('qr_scan_odoo_18.cron_post_reassign_chatter')._trigger()
+
     def mark_as_read(self):
         """Mark notification as read"""
         self.ensure_one()
@@ -56,21 +203,23 @@ class QRScanNotification(models.Model):
         if self.response != 'pending':
             return {'status': 'error', 'message': 'Already processed'}
         
-        # Update picking's assigned user
-        if self.picking_id and self.new_employee_id and self.new_employee_id.user_id:
-            self.picking_id.sudo().write({
+        # Update picking's assigned user (một phiếu hoặc cả nhóm phiếu của yêu cầu hàng loạt)
+        pickings = self.picking_id | self.picking_ids
+        if pickings and self.new_employee_id and self.new_employee_id.user_id:
+            pickings.sudo().write({
                 'shipping_confirmed_by': self.new_employee_id.user_id.id,
             })
             
             # Log to chatter
-            self.picking_id.message_post(
-                body=Markup(f"""
-                    <p><strong>✅ Yêu cầu chuyển giao được chấp nhận</strong></p>
-                    <p>{self.new_employee_id.name} đã đồng ý nhận công việc giao hàng cho phiếu {self.picking_id.name}</p>
-                """),
-                subject=f'Chấp nhận chuyển giao: {self.picking_id.name}',
-                message_type='notification',
-            )
+            for picking in pickings:
+                picking.message_post(
+                    body=Markup(f"""
+                        <p><strong>✅ Yêu cầu chuyển giao được chấp nhận</strong></p>
+                        <p>{self.new_employee_id.name} đã đồng ý nhận công việc giao hàng cho phiếu {picking.name}</p>
+                    """),
+                    subject=f'Chấp nhận chuyển giao: {picking.name}',
+                    message_type='notification',
+                )
         
         # Update notification
         self.write({
@@ -80,6 +229,8 @@ class QRScanNotification(models.Model):
             'response_date': fields.Datetime.now(),
         })
         
+        self._qr_notify_bus('responded')
+        
         return {'status': 'success', 'message': 'Đã chấp nhận yêu cầu chuyển giao'}
     
     def decline_reassignment(self):
@@ -92,15 +243,16 @@ class QRScanNotification(models.Model):
             return {'status': 'error', 'message': 'Already processed'}
         
         # Log to chatter
-        if self.picking_id and self.new_employee_id:
-            self.picking_id.message_post(
-                body=Markup(f"""
-                    <p><strong>❌ Yêu cầu chuyển giao bị từ chối</strong></p>
-                    <p>{self.new_employee_id.name} đã từ chối nhận công việc giao hàng cho phiếu {self.picking_id.name}</p>
-                """),
-                subject=f'Từ chối chuyển giao: {self.picking_id.name}',
-                message_type='notification',
-            )
+        if self.new_employee_id:
+            for picking in self.picking_id | self.picking_ids:
+                picking.message_post(
+                    body=Markup(f"""
+                        <p><strong>❌ Yêu cầu chuyển giao bị từ chối</strong></p>
+                        <p>{self.new_employee_id.name} đã từ chối nhận công việc giao hàng cho phiếu {picking.name}</p>
+                    """),
+                    subject=f'Từ chối chuyển giao: {picking.name}',
+                    message_type='notification',
+                )
         
         # Update notification
         self.write({
@@ -110,4 +262,6 @@ class QRScanNotification(models.Model):
             'response_date': fields.Datetime.now(),
         })
         
+        self._qr_notify_bus('responded')
+        
         return {'status': 'success', 'message': 'Đã từ chối yêu cầu chuyển giao'}
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields
+from odoo.tools.sql import table_exists
+
+
+class ResUsers(models.Model):
+    _inherit = 'res.users'
+
+    # Số thông báo App QR chưa đọc, cập nhật khi tạo / đánh dấu đã đọc thông báo
+    qr_unread_notification_count = fields.Integer(
+        string='Thông báo QR chưa đọc', readonly=True, default=0, copy=False)
+
+    def init(self):
+        super().init()
+        # Khởi tạo bộ đếm cho dữ liệu đã có (bảng thông báo chưa tồn tại khi cài mới)
+        if not table_exists(self._cr, 'qr_scan_notification'):
+            return
+        self._cr.execute("""
+            UPDATE res_users u
+               SET qr_unread_notification_count = COALESCE(n.unread, 0)
+              FROM res_users u2
+              LEFT JOIN (
+                    SELECT recipient_user_id, count(*) AS unread
+                      FROM qr_scan_notification
+                     WHERE is_read IS NOT TRUE
+                  GROUP BY recipient_user_id
+                   ) n ON n.recipient_user_id = u2.id
+             WHERE u.id = u2.id
+               AND u.qr_unread_notification_count IS DISTINCT FROM COALESCE(n.unread, 0)
+        """)
+
+    def write(self, vals):
+        res = super().write(vals)
+        # Token thiết bị của user bị khóa không còn dùng được
+        if 'active' in vals:
+            self.env['qr_scan.device.token']._invalidate_token_cache()
+        return res
+
+    def _qr_refresh_unread_count(self):
+        """Tính lại bộ đếm thông báo chưa đọc của các user (dùng partial index của thông báo)"""
+        if not self:
+            return
+        self.env['qr_scan.notification'].flush_model(['recipient_user_id', 'is_read'])
+        self.env.cr.execute("""
+            UPDATE res_users u
+               SET qr_unread_notification_count = (
+                       SELECT count(*)
+                         FROM qr_scan_notification n
+                        WHERE n.recipient_user_id = u.id
+                          AND n.is_read IS NOT TRUE
+                   )
+             WHERE u.id IN %s
+        """, [tuple(self.ids)])
+        self.invalidate_recordset(['qr_unread_notification_count'])
@@ -71,6 +71,41 @@ class SaleOrder(models.Model):
     # )
 
 
+    def _get_qr_expense_rows(self):
+        """Danh sách chi phí (hr.expense) của đơn hàng cho App QR, lấy bằng một câu SQL."""
+        self.ensure_one()
+        self.env.flush_all()
+        self.env.cr.execute("""
+            SELECT e.id,
+                   e.name,
+                   e.total_amount_currency,
+                   e.date,
+                   e.description,
+                   e.state,
+                   emp.name,
+                   COALESCE(pt.name->>%(lang)s, pt.name->>'en_US')
+            FROM hr_expense e
+            LEFT JOIN hr_employee emp ON emp.id = e.employee_id
+            LEFT JOIN product_product pp ON pp.id = e.product_id
+            LEFT JOIN product_template pt ON pt.id = pp.product_tmpl_id
+            WHERE e.sale_id = %(sale_id)s
+            ORDER BY e.date DESC, e.id DESC
+        """, {'sale_id': self.id, 'lang': self.env.lang or 'en_US'})
+        return [
+            {
+                'id': expense_id,
+                'name': name,
+                'total_amount_currency': amount,
+                'date': date.isoformat() if date else '',
+                'description': description or '',
+                'state': state,
+                'employee_name': employee_name or '',
+                'product_name': product_name or '',
+            }
+            for expense_id, name, amount, date, description, state, employee_name, product_name
+            in self.env.cr.fetchall()
+        ]
+
     def _prepare_picking_values(self):
         """Kế thừa Thông tin gửi xe và nhân viên sale xuống phiếu xuất kho"""
         res = super(SaleOrder, self)._prepare_picking_values()
@@ -1,13 +1,58 @@
+from collections import defaultdict
 from odoo import models, fields, api, _
 import qrcode
 import base64
 from io import BytesIO
+from datetime import timedelta
+import hashlib
+import json
+import unicodedata
 from odoo.exceptions import ValidationError
+from odoo.tools import SQL
+from odoo.tools.sql import create_index
 from markupsafe import Markup
 import logging
 
 _logger = logging.getLogger(__name__)
 
+# Thứ tự ưu tiên khi sắp xếp theo trạng thái quét trên dashboard: Đã giao việc -> Chuẩn bị -> Đóng gói
+SCAN_TYPE_PRIORITY = {
+    'assigned_task': 1,
+    'prepare': 2,
+    'shipping': 3,
+}
+SCAN_TYPE_PRIORITY_DEFAULT = 99
+
+# Kênh bus dashboard kho đăng ký để cập nhật từng dòng thay vì tải lại cả danh sách
+DASHBOARD_BUS_CHANNEL = 'qr_scan_dashboard'
+# Chỉ nhóm này được đăng ký kênh dashboard (xem ir.websocket)
+DASHBOARD_BUS_GROUP = 'stock.group_stock_user'
+DASHBOARD_BUS_TYPE = 'qr_scan.dashboard/picking_changed'
+# Tên bộ đếm thế hệ (qr_scan.cache.generation) của cache response dashboard
+DASHBOARD_CACHE_GENERATION = 'stock_picking_dashboard'
+# Các field dashboard đọc (cột, bộ lọc, sắp xếp, tìm kiếm): ghi vào thì cache response dashboard hết hiệu lực
+DASHBOARD_CACHE_FIELDS = {
+    'name', 'origin', 'state', 'scheduled_date', 'assigned_task_date', 'latest_scan_type',
+    'scan_type_priority', 'delivery_note', 'ship_inf_state', 'park_info', 'recipient_info',
+    'recipient_name', 'recipient_phone', 'recipient_address', 'sale_id', 'partner_id',
+    'shipping_method', 'is_tracked_shipping', 'shipping_confirmed_by', 'picking_type_id',
+    'company_id', 'sale_assigned_date', 'warehouse_acknowledged', 'dashboard_search_text',
+}
+# Ghi vào các field này thì phát sự kiện thay đổi cho dashboard
+DASHBOARD_WRITE_FIELDS = {
+    'state', 'ship_inf_state', 'shipping_confirmed_by', 'warehouse_acknowledged',
+    'sale_assigned_date', 'scheduled_date', 'shipping_method',
+}
+
+
+def fold_search_text(text):
+    """Chuẩn hóa chuỗi tìm kiếm: chữ thường, bỏ dấu tiếng Việt (kể cả đ -> d), gộp khoảng trắng"""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFD', text.lower().replace('đ', 'd'))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.split())
+
 class StockPicking(models.Model):
     _inherit = 'stock.picking'
 
@@ -34,6 +79,14 @@ class StockPicking(models.Model):
     ], string="Trạng thái quét mới nhất", compute='_compute_latest_scan_type', store=True)
 
     is_assigned = fields.Boolean("Đã giao việc", compute='_compute_latest_scan_type', store=True)
+
+    # Lưu sẵn để dashboard ORDER BY trực tiếp trong SQL
+    scan_type_priority = fields.Integer(
+        string="Thứ tự trạng thái quét",
+        compute='_compute_scan_type_priority',
+        store=True,
+        index=True,
+    )
     
     # Trường lưu thời gian giao việc (để sort)
     assigned_task_date = fields.Datetime(
@@ -53,6 +106,24 @@ class StockPicking(models.Model):
         help="Phương thức vận chuyển. Mặc định lấy từ đơn hàng nhưng có thể thay đổi."
     )
     
+    # Phương thức vận chuyển cần theo dõi gửi xe (Xe tải, Xe bus, Grab), lưu sẵn để lọc qua index
+    is_tracked_shipping = fields.Boolean(
+        string="Theo dõi gửi xe",
+        related='shipping_method.is_tracked_shipping',
+        store=True,
+        index=True,
+    )
+
+    # Chuỗi tìm kiếm đã bỏ dấu cho ô tìm kiếm "tất cả" của dashboard (index pg_trgm)
+    dashboard_search_text = fields.Char(
+        string="Chuỗi tìm kiếm dashboard",
+        compute='_compute_dashboard_search_text',
+        store=True,
+        index='trigram',
+        unaccent=False,
+        copy=False,
+    )
+
     # Trường loại vận chuyển (bao cước)
     type_shipping_cost = fields.Selection(
         selection=[
@@ -180,17 +251,189 @@ class StockPicking(models.Model):
     shipping_qr_code_image = fields.Binary('QR Code phiếu gửi xe', attachment=True)
     shipping_qr_code_data = fields.Char('Nội dung QR phiếu gửi xe')
 
+    def init(self):
+        super().init()
+        # Phục vụ API my_received: lọc theo (ship_inf_state, shipping_confirmed_by), phân trang keyset theo write_date
+        create_index(
+            self._cr,
+            'stock_picking_ship_inf_confirmed_write_idx',
+            self._table,
+            ['ship_inf_state', 'shipping_confirmed_by', 'write_date DESC', 'id DESC'],
+        )
+        # Phục vụ danh sách dashboard: thứ tự mặc định và thứ tự theo trạng thái quét
+        create_index(
+            self._cr,
+            'stock_picking_dashboard_date_order_idx',
+            self._table,
+            ['assigned_task_date ASC NULLS LAST', 'scheduled_date DESC NULLS LAST', 'id DESC'],
+        )
+        create_index(
+            self._cr,
+            'stock_picking_dashboard_scan_type_order_idx',
+            self._table,
+            ['scan_type_priority', 'assigned_task_date ASC NULLS LAST', 'scheduled_date DESC NULLS LAST', 'id DESC'],
+        )
+
+    @api.model
+    def _qr_dashboard_sort_keys(self, sort_by, sort_order):
+        """Các cột ORDER BY của danh sách dashboard: [(field, 'ASC'/'DESC')], luôn kết thúc bằng id.
+
+        Các cột có thể NULL luôn xếp NULLS LAST, keyset dựa vào quy ước này.
+        """
+        direction = 'ASC' if sort_order == 'asc' else 'DESC'
+        if sort_by == 'scan_type':
+            # Trong cùng trạng thái quét giữ thứ tự mặc định
+            return [
+                ('scan_type_priority', direction),
+                ('assigned_task_date', 'ASC'),
+                ('scheduled_date', 'DESC'),
+                ('id', 'DESC'),
+            ]
+        # Mặc định: assigned_task_date cũ nhất trước (NULL cuối), sau đó scheduled_date
+        return [('assigned_task_date', 'ASC'), ('scheduled_date', direction), ('id', direction)]
+
+    @api.model
+    def _qr_dashboard_search_page(self, domain, sort_by, sort_order, limit, cursor=None, offset=0):
+        """Một trang danh sách dashboard, sắp xếp hoàn toàn trong SQL.
+
+        cursor: next_cursor của trang trước (keyset, không dùng OFFSET); khi không có cursor
+        thì dùng offset (tương thích kiểu phân trang theo số trang cũ).
+        Trả về (records, next_cursor).
+        """
+        keys = self._qr_dashboard_sort_keys(sort_by, sort_order)
+        query = self._search(domain)
+        columns = [SQL.identifier(query.table, fname) for fname, _direction in keys]
+
+        if cursor:
+            values = self._qr_decode_dashboard_cursor(cursor, keys)
+            query.add_where(self._qr_keyset_condition(columns, keys, values))
+        elif offset:
+            query.offset = offset
+
+        query.order = self._qr_dashboard_order_sql(columns, keys)
+        query.limit = limit + 1
+        self.env.cr.execute(query.select(*columns))
+        rows = self.env.cr.fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self._qr_encode_dashboard_cursor(rows[-1], keys)
+        # id luôn là cột cuối
+        return self.browse([row[-1] for row in rows]), next_cursor
+
+    @api.model
+    def _qr_dashboard_order_sql(self, columns, keys):
+        return SQL(', ').join(
+            SQL('%s %s NULLS LAST', column, SQL(direction))
+            for column, (_fname, direction) in zip(columns, keys)
+        )
+
+    @api.model
+    def _qr_dashboard_id_query(self, domain, sort_by, sort_order):
+        """Câu SQL (chưa chạy) chọn toàn bộ id phiếu khớp domain theo thứ tự danh sách dashboard.
+
+        Dùng cho export: được mở thành server-side cursor và đọc dần từng lô.
+        """
+        keys = self._qr_dashboard_sort_keys(sort_by, sort_order)
+        query = self._search(domain)
+        columns = [SQL.identifier(query.table, fname) for fname, _direction in keys]
+        query.order = self._qr_dashboard_order_sql(columns, keys)
+        return query.select(SQL.identifier(query.table, 'id'))
+
+    @api.model
+    def _qr_keyset_condition(self, columns, keys, values):
+        """Điều kiện "đứng sau dòng cursor" theo thứ tự nhiều cột, NULLS LAST"""
+        conditions = []
+        for index, (column, (_fname, direction), value) in enumerate(zip(columns, keys, values)):
+            if value is None:
+                # Dòng cursor có NULL ở cột này: chỉ còn các dòng bằng nhau ở cột này mới đứng sau
+                continue
+            operator = '>' if direction == 'ASC' else '<'
+            after = SQL('(%s %s %s OR %s IS NULL)', column, SQL(operator), value, column)
+            equal_prefix = [
+                SQL('%s IS NOT DISTINCT FROM %s', prev_column, prev_value)
+                for prev_column, prev_value in zip(columns[:index], values[:index])
+            ]
+            conditions.append(SQL('(%s)', SQL(' AND ').join(equal_prefix + [after])))
+        return SQL('(%s)', SQL(' OR ').join(conditions)) if conditions else SQL('FALSE')
+
+    @api.model
+    def _qr_encode_dashboard_cursor(self, row, keys):
+        values = [
+            fields.Datetime.to_string(value) if fname.endswith('_date') and value else value
+            for value, (fname, _direction) in zip(row, keys)
+        ]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    @api.model
+    def _qr_decode_dashboard_cursor(self, cursor, keys):
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        if len(values) != len(keys):
+            raise ValidationError(_("Cursor phân trang không hợp lệ."))
+        return [
+            fields.Datetime.to_datetime(value) if fname.endswith('_date') and value else value
+            for value, (fname, _direction) in zip(values, keys)
+        ]
+
+    @api.model
+    def _qr_search_received_page(self, user_id, limit, cursor=None, since=None):
+        """Trang phiếu 'Đã nhận' của user, phân trang keyset theo (write_date, id) giảm dần.
+
+        cursor: (write_date, id) của dòng cuối trang trước.
+        since: chỉ lấy các phiếu thay đổi sau thời điểm này (delta sync).
+        Trả về recordset theo đúng thứ tự, tối đa ``limit`` + 1 dòng để biết còn trang sau hay không.
+        """
+        self.env.flush_all()
+        query = """
+            SELECT sp.id
+            FROM stock_picking sp
+            JOIN stock_picking_type spt ON spt.id = sp.picking_type_id
+            WHERE spt.code = 'outgoing'
+              AND sp.ship_inf_state = 'received'
+              AND sp.shipping_confirmed_by = %(user_id)s
+        """
+        query_params = {'user_id': user_id, 'limit': limit + 1}
+        if since:
+            query += " AND sp.write_date > %(since)s"
+            query_params['since'] = since
+        if cursor:
+            query += " AND (sp.write_date, sp.id) < (%(cursor_date)s, %(cursor_id)s)"
+            query_params['cursor_date'], query_params['cursor_id'] = cursor
+        query += " ORDER BY sp.write_date DESC, sp.id DESC LIMIT %(limit)s"
+        self.env.cr.execute(query, query_params)
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    @api.model
+    def _qr_get_received_version(self, user_id):
+        """Version của tập phiếu 'Đã nhận' của user (đổi khi có phiếu được thêm, bớt hoặc sửa)"""
+        self.env.flush_all()
+        self.env.cr.execute("""
+            SELECT md5(COALESCE(string_agg(sp.id::text || ':' || sp.write_date::text, ',' ORDER BY sp.id), ''))
+            FROM stock_picking sp
+            JOIN stock_picking_type spt ON spt.id = sp.picking_type_id
+            WHERE spt.code = 'outgoing'
+              AND sp.ship_inf_state = 'received'
+              AND sp.shipping_confirmed_by = %s
+        """, [user_id])
+        return self.env.cr.fetchone()[0][:16]
+
+    @api.model
+    def _qr_get_sync_token(self):
+        """Mốc thời gian cho lần delta sync tiếp theo.
+
+        Lùi lại một khoảng an toàn vì write_date là thời điểm bắt đầu transaction:
+        các phiếu ghi bởi transaction đang chạy có thể commit sau lần gọi này.
+        App loại trùng theo id.
+        """
+        return fields.Datetime.to_string(self.env.cr.now() - timedelta(minutes=5))
+
     def _is_tracked_shipping_method(self):
         """Kiểm tra xem phương thức vận chuyển có thuộc loại cần quét gửi xe (Xe tải/Xe bus, Grab) hay không.
         Chỉ áp dụng cho phiếu xuất hàng (outgoing).
         """
         self.ensure_one()
-        if self.picking_type_code != 'outgoing':
-            return False
-        if not self.shipping_method:
-            return False
-        name = (self.shipping_method.name or '').lower()
-        return any(x in name for x in ['xe tải', 'xe bus', 'grab'])
+        return self.picking_type_code == 'outgoing' and self.is_tracked_shipping
 
     def action_complete_delivery(self, images_data=None, note=''):
         """Xác nhận đã giao hàng thành công (chuyển sang Hoàn thành và lưu ảnh)"""
@@ -282,6 +525,26 @@ class StockPicking(models.Model):
             ).sorted('scan_date')[:1]  # Lấy assigned_task đầu tiên (cũ nhất)
             record.assigned_task_date = assigned_task_history.scan_date if assigned_task_history else False
     
+    @api.depends(
+        'name', 'origin', 'partner_id.name', 'sale_id.name',
+        'sale_id.user_id.partner_id.name', 'shipping_method.name',
+    )
+    def _compute_dashboard_search_text(self):
+        for record in self:
+            record.dashboard_search_text = fold_search_text(' '.join(filter(None, [
+                record.name,
+                record.origin,
+                record.partner_id.name,
+                record.sale_id.name,
+                record.sale_id.user_id.name,
+                record.shipping_method.name,
+            ])))
+
+    @api.depends('latest_scan_type')
+    def _compute_scan_type_priority(self):
+        for record in self:
+            record.scan_type_priority = SCAN_TYPE_PRIORITY.get(record.latest_scan_type, SCAN_TYPE_PRIORITY_DEFAULT)
+
     @api.depends('warehouse_acknowledged', 'sale_assigned_date', 'warehouse_acknowledged_date')
     def _compute_needs_recheck(self):
         """
@@ -403,6 +666,66 @@ class StockPicking(models.Model):
         self._update_products_latest_stock_increase_date()
         return result
 
+    def write(self, vals):
+        res = super().write(vals)
+        if DASHBOARD_CACHE_FIELDS.intersection(vals):
+            self._qr_invalidate_dashboard_cache()
+        if DASHBOARD_WRITE_FIELDS.intersection(vals):
+            self._qr_notify_dashboard()
+        return res
+
+    def _action_done(self):
+        res = super()._action_done()
+        self._qr_notify_dashboard()
+        return res
+
+    def action_cancel(self):
+        res = super().action_cancel()
+        self._qr_notify_dashboard()
+        return res
+
+    @api.model
+    def _qr_dashboard_generation(self):
+        """Thế hệ dữ liệu dashboard hiện tại (trong snapshot của request), dùng làm một phần khóa cache response"""
+        return self.env['qr_scan.cache.generation']._get_generation(DASHBOARD_CACHE_GENERATION)
+
+    def _qr_invalidate_dashboard_cache(self):
+        """Tăng thế hệ dashboard sau khi transaction commit (một lần mỗi transaction)"""
+        self.env['qr_scan.cache.generation']._bump_generation(DASHBOARD_CACHE_GENERATION)
+
+    def _qr_notify_dashboard(self):
+        """Đánh dấu phiếu cần phát sự kiện thay đổi cho dashboard.
+
+        Các phiếu được gom lại và gửi một tin nhắn bus duy nhất ngay trước khi commit,
+        khi các field tính toán (latest_scan_type, assigned_task_date...) đã có giá trị cuối.
+        """
+        if not self:
+            return
+        self._qr_invalidate_dashboard_cache()
+        pending = self.env.cr.precommit.data.setdefault('qr_scan.dashboard_picking_ids', set())
+        if not pending:
+            self.env.cr.precommit.add(self._qr_send_dashboard_events)
+        pending.update(self.ids)
+
+    def _qr_send_dashboard_events(self):
+        picking_ids = self.env.cr.precommit.data.pop('qr_scan.dashboard_picking_ids', set())
+        pickings = self.sudo().browse(picking_ids).exists().filtered(
+            lambda picking: picking.picking_type_code == 'outgoing')
+        if not pickings:
+            return
+        events = [
+            {
+                'id': picking.id,
+                'latest_scan_type': picking.latest_scan_type,
+                'state': picking.state,
+                'ship_inf_state': picking.ship_inf_state,
+                # UTC, dashboard tự đổi sang múi giờ người dùng
+                'assigned_task_date': fields.Datetime.to_string(picking.assigned_task_date) if picking.assigned_task_date else False,
+            }
+            for picking in pickings
+        ]
+        self.env['bus.bus'].sudo()._sendone(DASHBOARD_BUS_CHANNEL, DASHBOARD_BUS_TYPE, {'pickings': events})
+
     def action_fill_all_quantities(self):
         """Điền toàn bộ số lượng thực hiện bằng đúng nhu cầu trên các stock move."""
         for picking in self:
@@ -424,6 +747,7 @@ class StockPicking(models.Model):
 
     def create(self, vals):
         picking = super().create(vals)
+        picking._qr_invalidate_dashboard_cache()
         return picking
 
     def _generate_qr_code(self):
@@ -497,6 +821,53 @@ class StockPicking(models.Model):
         })  
         return result
     
+    def _get_qr_stock_availability(self):
+        """Tồn kho theo vị trí nguồn cho toàn bộ sản phẩm trong phiếu (dùng cho API quét QR).
+
+        Gom sản phẩm theo vị trí nguồn và đọc qty_available/free_qty một lần cho mỗi vị trí,
+        thay vì tính tồn riêng cho từng sản phẩm.
+        Trả về dict {(product_id, location_id): (qty_available, free_qty)}.
+        """
+        self.ensure_one()
+        product_ids_by_location = defaultdict(set)
+        for move in self.move_ids:
+            if move.state == 'cancel':
+                continue
+            product_ids_by_location[move.location_id.id].add(move.product_id.id)
+
+        Product = self.env['product.product']
+        availability = {}
+        for location_id, product_ids in product_ids_by_location.items():
+            products = Product.browse(list(product_ids)).with_context(location=location_id)
+            for row in products.read(['qty_available', 'free_qty']):
+                availability[(row['id'], location_id)] = (row['qty_available'], row['free_qty'])
+        return availability
+
+    def _get_qr_detail_version(self):
+        """Token phiên bản rẻ cho dữ liệu API chi tiết phiếu (quét QR).
+
+        Ghép write_date của phiếu, write_date lớn nhất của các stock.move, id lịch sử quét mới nhất
+        cùng các mốc thay đổi của đơn bán, khách hàng và tồn kho các sản phẩm trong phiếu.
+        Chỉ cần một câu SQL, không phải dựng lại toàn bộ payload.
+        """
+        self.ensure_one()
+        self.env.flush_all()
+        self.env.cr.execute("""
+            SELECT sp.write_date,
+                   (SELECT MAX(sm.write_date) FROM stock_move sm WHERE sm.picking_id = sp.id),
+                   (SELECT MAX(h.id) FROM stock_picking_scan_history h WHERE h.picking_id = sp.id),
+                   so.write_date,
+                   rp.write_date,
+                   (SELECT MAX(q.write_date) FROM stock_quant q
+                     WHERE q.product_id IN (SELECT sm2.product_id FROM stock_move sm2 WHERE sm2.picking_id = sp.id))
+            FROM stock_picking sp
+            LEFT JOIN sale_order so ON so.id = sp.sale_id
+            LEFT JOIN res_partner rp ON rp.id = sp.partner_id
+            WHERE sp.id = %s
+        """, (self.id,))
+        row = self.env.cr.fetchone()
+        return hashlib.sha1(repr(row).encode()).hexdigest()[:16]
+
     def _prepare_picking_report_rows(self):
         """Chuẩn bị dữ liệu dòng in phiếu theo sản phẩm (O(n)).
 
@@ -756,6 +1127,12 @@ class StockPickingScanHistory(models.Model):
     def _compute_image_count(self):
         for record in self:
             record.image_count = len(record.attachment_ids)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        histories = super().create(vals_list)
+        histories.picking_id._qr_notify_dashboard()
+        return histories
     
     def save_images(self, images_data):
         if not images_data or len(images_data) == 0:
@@ -2,4 +2,6 @@
 
 from . import scan_processor
 from . import qr_service
-from . import scan_processors
\ No newline at end of file
+from . import scan_processors
+from . import dashboard_suggestion
+from . import dashboard_row_serializer
@@ -0,0 +1,241 @@
+from datetime import datetime
+
+import pytz
+
+from odoo import models, api
+
+# Bảng cần JOIN cho từng alias (alias -> (alias phụ thuộc, mệnh đề JOIN))
+PROJECTION_JOINS = {
+    'so': (None, "LEFT JOIN sale_order so ON so.id = sp.sale_id"),
+    'su': ('so', "LEFT JOIN res_users su ON su.id = so.user_id"),
+    'sup': ('su', "LEFT JOIN res_partner sup ON sup.id = su.partner_id"),
+    'rp': (None, "LEFT JOIN res_partner rp ON rp.id = sp.partner_id"),
+    'dc': (None, "LEFT JOIN delivery_carrier dc ON dc.id = sp.shipping_method"),
+    'scu': (None, "LEFT JOIN res_users scu ON scu.id = sp.shipping_confirmed_by"),
+    'scp': ('scu', "LEFT JOIN res_partner scp ON scp.id = scu.partner_id"),
+}
+
+# Cột có thể lấy trong một câu SQL: tên -> (biểu thức SQL, alias cần JOIN)
+PROJECTION_COLUMNS = {
+    'id': ('sp.id', None),
+    'name': ('sp.name', None),
+    'origin': ('sp.origin', None),
+    'state': ('sp.state', None),
+    'scheduled_date': ('sp.scheduled_date', None),
+    'assigned_task_date': ('sp.assigned_task_date', None),
+    'latest_scan_type': ('sp.latest_scan_type', None),
+    'scan_type_priority': ('sp.scan_type_priority', None),
+    'delivery_note': ('sp.delivery_note', None),
+    'ship_inf_state': ('sp.ship_inf_state', None),
+    'park_info': ('sp.park_info', None),
+    'recipient_info': ('sp.recipient_info', None),
+    'recipient_name': ('sp.recipient_name', None),
+    'recipient_phone': ('sp.recipient_phone', None),
+    'recipient_address': ('sp.recipient_address', None),
+    'sale_id': ('sp.sale_id', None),
+    'shipping_confirmed_by': ('sp.shipping_confirmed_by', None),
+    'sale_name': ('so.name', 'so'),
+    'salesperson_name': ('sup.name', 'sup'),
+    'partner_name': ('rp.name', 'rp'),
+    'partner_phone': ('rp.phone', 'rp'),
+    'partner_mobile': ('rp.mobile', 'rp'),
+    'partner_street': ('rp.street', 'rp'),
+    'partner_street2': ('rp.street2', 'rp'),
+    'partner_city': ('rp.city', 'rp'),
+    'carrier_name': ("COALESCE(dc.name->>%(lang)s, dc.name->>'en_US')", 'dc'),
+    'shipping_confirmed_by_name': ('scp.name', 'scp'),
+}
+
+
+class RowContext(object):
+    """Dữ liệu dùng chung khi dựng các dòng của một trang: múi giờ (tính một lần) và nhãn hiển thị"""
+
+    def __init__(self, tz_name, labels=None):
+        self.tz = pytz.timezone(tz_name or 'UTC')
+        self.labels = labels or {}
+
+    def format_datetime(self, value):
+        if not value:
+            return ''
+        if not isinstance(value, datetime):
+            return str(value)
+        return pytz.utc.localize(value).astimezone(self.tz).strftime('%Y-%m-%d %H:%M:%S')
+
+    def label(self, kind, value, default=''):
+        return self.labels.get(kind, {}).get(value, default)
+
+
+def _recipient_address(row, ctx):
+    if row['recipient_address']:
+        return row['recipient_address']
+    return ', '.join(filter(None, [row['partner_street'], row['partner_street2'], row['partner_city']]))
+
+
+# Dòng danh sách phiếu xuất: tên field -> (cột projection cần, hàm dựng giá trị)
+LIST_ROW_FIELDS = {
+    'id': (('id',), lambda row, ctx: row['id']),
+    'name': (('name',), lambda row, ctx: row['name']),
+    'date': (('scheduled_date',), lambda row, ctx: ctx.format_datetime(row['scheduled_date'])),
+    'sale_order': (('sale_name',), lambda row, ctx: row['sale_name'] or ''),
+    'customer': (('partner_name',), lambda row, ctx: row['partner_name'] or ''),
+    'salesperson': (('salesperson_name',), lambda row, ctx: row['salesperson_name'] or ''),
+    'shipping_method': (('carrier_name',), lambda row, ctx: row['carrier_name'] or ''),
+    'scan_type': (('latest_scan_type',), lambda row, ctx: row['latest_scan_type'] or False),
+    'scan_type_label': (('latest_scan_type',), lambda row, ctx: ctx.label('scan_type', row['latest_scan_type'])),
+    'scan_type_priority': (('scan_type_priority',), lambda row, ctx: row['scan_type_priority']),
+    'state': (('state',), lambda row, ctx: row['state']),
+    'state_label': (('state',), lambda row, ctx: ctx.label('state', row['state'], row['state'])),
+    'origin': (('origin',), lambda row, ctx: row['origin'] or ''),
+    'note': (('delivery_note',), lambda row, ctx: row['delivery_note'] or ''),
+    'assigned_task_date': (('assigned_task_date',), lambda row, ctx: ctx.format_datetime(row['assigned_task_date'])),
+    'sale_id': (('sale_id',), lambda row, ctx: row['sale_id'] or False),
+}
+
+# Dòng danh sách đơn gửi xe
+DELIVERY_ROW_FIELDS = {
+    'id': LIST_ROW_FIELDS['id'],
+    'name': LIST_ROW_FIELDS['name'],
+    'date': LIST_ROW_FIELDS['date'],
+    'sale_order': LIST_ROW_FIELDS['sale_order'],
+    'customer': LIST_ROW_FIELDS['customer'],
+    'salesperson': LIST_ROW_FIELDS['salesperson'],
+    'shipping_method': LIST_ROW_FIELDS['shipping_method'],
+    'state': LIST_ROW_FIELDS['state'],
+    'state_label': LIST_ROW_FIELDS['state_label'],
+    'assigned_task_date': LIST_ROW_FIELDS['assigned_task_date'],
+    'sale_id': LIST_ROW_FIELDS['sale_id'],
+    'recipient_name': (
+        ('recipient_name', 'recipient_info', 'partner_name'),
+        lambda row, ctx: row['recipient_name'] or row['recipient_info'] or row['partner_name'] or '',
+    ),
+    'recipient_phone': (
+        ('recipient_phone', 'partner_phone', 'partner_mobile'),
+        lambda row, ctx: row['recipient_phone'] or row['partner_phone'] or row['partner_mobile'] or '',
+    ),
+    'recipient_address': (
+        ('recipient_address', 'partner_street', 'partner_street2', 'partner_city'),
+        _recipient_address,
+    ),
+    'park_info': (('park_info',), lambda row, ctx: row['park_info'] or ''),
+    'ship_inf_state': (('ship_inf_state',), lambda row, ctx: row['ship_inf_state'] or ''),
+    'shipping_confirmed_by_id': (('shipping_confirmed_by',), lambda row, ctx: row['shipping_confirmed_by'] or False),
+    'shipping_confirmed_by_name': (('shipping_confirmed_by_name',), lambda row, ctx: row['shipping_confirmed_by_name'] or ''),
+}
+
+
+# Dòng danh sách phiếu 'Đã nhận' của App (/api/picking/my_received): ngày dạng ISO theo UTC
+RECEIVED_ROW_FIELDS = {
+    'id': LIST_ROW_FIELDS['id'],
+    'name': LIST_ROW_FIELDS['name'],
+    'origin': LIST_ROW_FIELDS['origin'],
+    'state': LIST_ROW_FIELDS['state'],
+    'scheduled_date': (
+        ('scheduled_date',),
+        lambda row, ctx: row['scheduled_date'].isoformat() if row['scheduled_date'] else None,
+    ),
+    'customer': LIST_ROW_FIELDS['customer'],
+    'shipping_method': LIST_ROW_FIELDS['shipping_method'],
+    'ship_inf_state': (('ship_inf_state',), lambda row, ctx: row['ship_inf_state'] or False),
+    'recipient_info': (('recipient_info',), lambda row, ctx: row['recipient_info'] or ''),
+    'park_info': DELIVERY_ROW_FIELDS['park_info'],
+}
+
+# Mô tả field của các dòng (schema công bố cho client): tên -> (kiểu, mô tả)
+ROW_FIELD_INFO = {
+    'id': ('integer', 'ID phiếu'),
+    'name': ('string', 'Mã phiếu'),
+    'date': ('datetime', 'Ngày dự kiến (múi giờ người dùng, YYYY-MM-DD HH:MM:SS)'),
+    'scheduled_date': ('datetime', 'Ngày dự kiến (UTC, ISO 8601)'),
+    'sale_order': ('string', 'Mã đơn bán'),
+    'sale_id': ('integer', 'ID đơn bán'),
+    'customer': ('string', 'Khách hàng'),
+    'salesperson': ('string', 'NV kinh doanh'),
+    'shipping_method': ('string', 'Phương thức vận chuyển'),
+    'scan_type': ('selection', 'Trạng thái quét mới nhất'),
+    'scan_type_label': ('string', 'Nhãn trạng thái quét'),
+    'scan_type_priority': ('integer', 'Thứ tự trạng thái quét'),
+    'state': ('selection', 'Trạng thái phiếu'),
+    'state_label': ('string', 'Nhãn trạng thái phiếu'),
+    'origin': ('string', 'Chứng từ gốc'),
+    'note': ('string', 'Ghi chú giao hàng'),
+    'assigned_task_date': ('datetime', 'Thời gian giao việc (múi giờ người dùng)'),
+    'recipient_name': ('string', 'Người nhận (mặc định: khách hàng)'),
+    'recipient_phone': ('string', 'SĐT người nhận (mặc định: SĐT khách hàng)'),
+    'recipient_address': ('string', 'Địa chỉ người nhận (mặc định: địa chỉ khách hàng)'),
+    'recipient_info': ('string', 'Người nhận (phiếu gửi xe)'),
+    'park_info': ('string', 'Thông tin gửi xe'),
+    'ship_inf_state': ('selection', 'Trạng thái gửi xe'),
+    'shipping_confirmed_by_id': ('integer', 'ID người xác nhận gửi xe'),
+    'shipping_confirmed_by_name': ('string', 'Người xác nhận gửi xe'),
+}
+
+
+def row_fields_schema(row_fields):
+    """Schema các field có thể chọn qua tham số ``fields``"""
+    return [
+        {'name': name, 'type': ROW_FIELD_INFO[name][0], 'description': ROW_FIELD_INFO[name][1]}
+        for name in row_fields
+    ]
+
+
+def select_row_fields(row_fields, field_names):
+    """Tập con của ``row_fields`` theo tham số ``fields`` (list hoặc chuỗi cách nhau bởi dấu phẩy).
+
+    Không truyền ``fields`` thì giữ tất cả; 'id' luôn có mặt.
+    """
+    if not field_names:
+        return row_fields
+    if isinstance(field_names, str):
+        field_names = field_names.split(',')
+    field_names = [name.strip() for name in field_names if name and name.strip()]
+    unknown = [name for name in field_names if name not in row_fields]
+    if unknown:
+        raise ValueError('Field không hợp lệ: %s' % ', '.join(unknown))
+    return {name: spec for name, spec in row_fields.items() if name == 'id' or name in field_names}
+
+
+class DashboardRowSerializer(models.AbstractModel):
+    _name = 'stock.picking.dashboard.row.serializer'
+    _description = 'Dashboard Row Serializer'
+
+    @api.model
+    def serialize(self, picking_ids, row_fields, labels=None, field_names=None):
+        """Dựng các dòng dashboard cho ``picking_ids`` (giữ nguyên thứ tự) bằng một câu SQL projection.
+
+        row_fields: LIST_ROW_FIELDS / DELIVERY_ROW_FIELDS / RECEIVED_ROW_FIELDS;
+        field_names: tham số ``fields`` của client, chỉ dựng các field được yêu cầu.
+        Chỉ các cột mà các field này cần mới được SELECT/JOIN.
+        Quyền truy cập đã được kiểm tra khi tìm ``picking_ids`` bằng ORM.
+        """
+        row_fields = select_row_fields(row_fields, field_names)
+        if not picking_ids:
+            return []
+        columns = {'id'}
+        for needed, _builder in row_fields.values():
+            columns.update(needed)
+        rows = self._fetch_projection(picking_ids, sorted(columns))
+        ctx = RowContext(self.env.context.get('tz') or self.env.user.tz, labels)
+        return [
+            {name: builder(row, ctx) for name, (_needed, builder) in row_fields.items()}
+            for row in (rows[picking_id] for picking_id in picking_ids if picking_id in rows)
+        ]
+
+    @api.model
+    def _fetch_projection(self, picking_ids, columns):
+        """{id: {cột: giá trị}} cho các phiếu, chỉ JOIN các bảng cần cho ``columns``"""
+        aliases = []
+        for column in columns:
+            alias = PROJECTION_COLUMNS[column][1]
+            while alias and alias not in aliases:
+                aliases.append(alias)
+                alias = PROJECTION_JOINS[alias][0]
+        # Bảng phụ thuộc phải JOIN trước
+        joins = [PROJECTION_JOINS[alias][1] for alias in PROJECTION_JOINS if alias in aliases]
+        select = ', '.join('%s AS "%s"' % (PROJECTION_COLUMNS[column][0], column) for column in columns)
+
+        self.env.flush_all()
+        self.env.cr.execute(
+            "SELECT %s FROM stock_picking sp %s WHERE sp.id = ANY(%%(ids)s)" % (select, ' '.join(joins)),
+            {'ids': list(picking_ids), 'lang': self.env.lang or 'en_US'},
+        )
+        return {row['id']: row for row in self.env.cr.dictfetchall()}
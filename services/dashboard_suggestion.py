@@ -0,0 +1,177 @@
+from datetime import date, timedelta
+import re
+
+from odoo import models, api
+from odoo.tools.sql import create_index
+
+from ..controllers.cache_utils import LRUCache
+from ..models.stock_picking_qr import fold_search_text
+
+# Gợi ý tìm kiếm dùng chung giữa các request trong worker, khóa theo (db, field, từ khóa, ...)
+SUGGESTION_CACHE = LRUCache(maxsize=512, ttl=30)
+
+# Từ khóa dạng tiền tố ngày: YYYY, YYYY-M, YYYY-MM, YYYY-MM-D...
+DATE_PREFIX_RE = re.compile(r'^(\d{4})(?:-(\d{1,2})(?:-(\d{1,2}))?)?-?$')
+# Khi từ khóa ngày không phải tiền tố, tìm trong khoảng này (ngày) tính từ hôm nay
+DATE_FALLBACK_DAYS = 366
+
+# Chỉ lấy giá trị thuộc phiếu xuất, trong các công ty đang chọn
+OUTGOING_PICKING_SQL = """
+    SELECT 1
+    FROM stock_picking sp
+    JOIN stock_picking_type spt ON spt.id = sp.picking_type_id AND spt.code = 'outgoing'
+    WHERE sp.company_id = ANY(%(company_ids)s)
+"""
+
+
+class DashboardSuggestionService(models.AbstractModel):
+    _name = 'stock.picking.dashboard.suggestion.service'
+    _description = 'Dashboard Search Suggestion Service'
+
+    def init(self):
+        super().init()
+        # Phục vụ gợi ý khách hàng: res_partner.name ILIKE '%từ khóa%' cần index pg_trgm
+        if self.env.registry.has_trigram:
+            create_index(
+                self._cr,
+                'res_partner_name_trgm_idx',
+                'res_partner',
+                ['name gin_trgm_ops'],
+                method='gin',
+            )
+
+    @api.model
+    def get_suggestions(self, search_field, search_term, limit=10):
+        """Gợi ý giá trị phân biệt (distinct) cho ô tìm kiếm dashboard.
+
+        Mỗi loại field truy vấn thẳng bảng nguồn (SO, khách hàng, vận chuyển...) qua index,
+        chỉ giữ giá trị có phiếu xuất. Kết quả cache ngắn hạn theo (field, từ khóa).
+        """
+        key = (
+            self.env.cr.dbname, search_field, search_term.strip().lower(), limit,
+            self.env.lang, tuple(self.env.companies.ids),
+        )
+        suggestions = SUGGESTION_CACHE.get(key)
+        if suggestions is None:
+            method = getattr(self, '_suggest_%s' % search_field, None)
+            suggestions = method(search_term.strip(), limit) if method else []
+            SUGGESTION_CACHE.set(key, suggestions)
+        return [dict(item) for item in suggestions]
+
+    def _query_values(self, query, params):
+        params = dict(params, company_ids=self.env.companies.ids)
+        self.env.flush_all()
+        self.env.cr.execute(query, params)
+        return [{'value': row[0], 'label': row[-1]} for row in self.env.cr.fetchall()]
+
+    def _suggest_picking_name(self, search_term, limit):
+        return self._query_values("""
+            SELECT sp.name
+            FROM stock_picking sp
+            JOIN stock_picking_type spt ON spt.id = sp.picking_type_id AND spt.code = 'outgoing'
+            WHERE sp.company_id = ANY(%(company_ids)s)
+              AND sp.name ILIKE %(term)s
+            ORDER BY sp.id DESC
+            LIMIT %(limit)s
+        """, {'term': '%%%s%%' % search_term, 'limit': limit})
+
+    def _suggest_sale_order(self, search_term, limit):
+        return self._query_values("""
+            SELECT so.name
+            FROM sale_order so
+            WHERE so.name ILIKE %(term)s
+              AND EXISTS (""" + OUTGOING_PICKING_SQL + """ AND sp.sale_id = so.id)
+            ORDER BY so.id DESC
+            LIMIT %(limit)s
+        """, {'term': '%%%s%%' % search_term, 'limit': limit})
+
+    def _suggest_customer(self, search_term, limit):
+        return self._query_values("""
+            SELECT p.name
+            FROM res_partner p
+            WHERE p.name ILIKE %(term)s
+              AND EXISTS (""" + OUTGOING_PICKING_SQL + """ AND sp.partner_id = p.id)
+            GROUP BY p.name
+            ORDER BY p.name
+            LIMIT %(limit)s
+        """, {'term': '%%%s%%' % search_term, 'limit': limit})
+
+    def _suggest_shipping_method(self, search_term, limit):
+        return self._query_values("""
+            SELECT name
+            FROM (
+                SELECT COALESCE(dc.name->>%(lang)s, dc.name->>'en_US') AS name
+                FROM delivery_carrier dc
+                WHERE EXISTS (""" + OUTGOING_PICKING_SQL + """ AND sp.shipping_method = dc.id)
+            ) carriers
+            WHERE name ILIKE %(term)s
+            GROUP BY name
+            ORDER BY name
+            LIMIT %(limit)s
+        """, {'term': '%%%s%%' % search_term, 'limit': limit, 'lang': self.env.lang or 'en_US'})
+
+    def _suggest_all(self, search_term, limit):
+        return self._query_values("""
+            SELECT sp.name,
+                   CASE WHEN p.name IS NOT NULL THEN sp.name || ' - ' || p.name ELSE sp.name END
+            FROM stock_picking sp
+            JOIN stock_picking_type spt ON spt.id = sp.picking_type_id AND spt.code = 'outgoing'
+            LEFT JOIN res_partner p ON p.id = sp.partner_id
+            WHERE sp.company_id = ANY(%(company_ids)s)
+              AND sp.dashboard_search_text ILIKE %(term)s
+            ORDER BY sp.id DESC
+            LIMIT %(limit)s
+        """, {'term': '%%%s%%' % fold_search_text(search_term), 'limit': limit})
+
+    def _suggest_date(self, search_term, limit):
+        """Ngày (YYYY-MM-DD, theo UTC như trước) có phiếu xuất, mới nhất trước.
+
+        Từ khóa dạng tiền tố (năm / tháng / ngày) được đổi thành khoảng ngày tương ứng,
+        ngược lại chỉ xét các ngày trong năm gần nhất.
+        Mỗi ngày ứng viên chỉ cần một lần dò index scheduled_date (EXISTS), dừng khi đủ ``limit``:
+        truy vấn không ORDER BY (ORDER BY buộc Postgres dò hết mọi ngày trước khi áp LIMIT),
+        chỉ sắp lại vài kết quả trong Python. LIMIT sớm dựa vào việc ``unnest`` trả phần tử
+        theo thứ tự mảng (mới nhất trước); Postgres không cam kết điều này khi không có ORDER BY,
+        nên nếu thứ tự đổi thì gợi ý vẫn đúng nhưng có thể không phải các ngày mới nhất.
+        """
+        candidates = self._date_candidates(search_term.strip())
+        if not candidates:
+            return []
+        values = self._query_values("""
+            SELECT to_char(c.d, 'YYYY-MM-DD')
+            FROM unnest(%(days)s::date[]) AS c(d)
+            WHERE EXISTS (""" + OUTGOING_PICKING_SQL + """
+                  AND sp.scheduled_date >= c.d
+                  AND sp.scheduled_date < c.d + 1)
+            LIMIT %(limit)s
+        """, {'days': candidates, 'limit': limit})
+        return sorted(values, key=lambda item: item['value'], reverse=True)
+
+    @api.model
+    def _date_candidates(self, search_term):
+        """Danh sách ngày ứng viên (mới nhất trước) có chuỗi 'YYYY-MM-DD' chứa từ khóa"""
+        match = DATE_PREFIX_RE.match(search_term)
+        try:
+            if not match:
+                end = date.today()
+                start = end - timedelta(days=DATE_FALLBACK_DAYS)
+            else:
+                year, month, day = match.groups()
+                if day and len(day) == 2:
+                    start = end = date(int(year), int(month), int(day))
+                elif month and len(month) == 2:
+                    start = date(int(year), int(month), 1)
+                    end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+                else:
+                    start, end = date(int(year), 1, 1), date(int(year), 12, 31)
+        except ValueError:
+            return []
+
+        days = []
+        current = end
+        while current >= start:
+            value = current.strftime('%Y-%m-%d')
+            if search_term in value:
+                days.append(value)
+            current -= timedelta(days=1)
+        return days
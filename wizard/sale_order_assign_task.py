@@ -178,11 +178,10 @@ class SaleOrderAssignTask(models.TransientModel):
             self.recipient_phone = recipient_vals.get('recipient_phone')
             self.recipient_address = recipient_vals.get('recipient_address')
 
-    @api.depends('shipping_method_name')
+    @api.depends('shipping_method_id.is_tracked_shipping')
     def _compute_is_bus_shipping(self):
         for rec in self:
-            name = (rec.shipping_method_name or '').strip()
-            rec.is_bus_shipping = 'Xe tải' in name or 'Xe bus' in name if name else False
+            rec.is_bus_shipping = rec.shipping_method_id.is_tracked_shipping
 
     @api.depends('partner_id')
     def _compute_shipping_history(self):